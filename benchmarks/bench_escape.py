@@ -0,0 +1,55 @@
+# Микробенчмарк экранирования MarkdownV2: прежняя реализация на re.sub против новой
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.bench_escape
+import re
+import timeit
+
+from cashka_preprocessor import cleaned_description
+from corpus_store import chashka
+from markdown_escape import escape_markdown
+from message_render import SLOT_COUNT, description_page, prerender_all
+
+
+def legacy_escape_markdown(text: str) -> str:
+    """Реализация bot.escape_markdown до выноса в markdown_escape."""
+    if not isinstance(text, str):
+        text = str(text)
+    escape_chars = r'_*[]()~`>#+-.=|{}.!'
+    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', text)
+
+
+def bench(label: str, func, samples: list, number: int) -> float:
+    seconds = timeit.timeit(lambda: [func(s) for s in samples], number=number)
+    per_call = seconds / (number * len(samples)) * 1e6
+    print(f"  {label:<28} {per_call:10.2f} мкс/вызов")
+    return per_call
+
+
+def main() -> None:
+    keys = list(chashka)
+    descriptions = [cleaned_description(key).replace('**', '*').replace('\n\n', '\n') for key in keys]
+    labels = ["Карма рода. Наследственность, прошлый опыт).", "1-й период", "09.10.1988", 17]
+
+    for text in descriptions + labels:
+        assert escape_markdown(text) == legacy_escape_markdown(text)
+
+    print("Короткие подписи и значения:")
+    old = bench("re.sub (прежняя)", legacy_escape_markdown, labels, 20000)
+    new = bench("markdown_escape", escape_markdown, labels, 20000)
+    print(f"  ускорение: x{old / new:.1f}")
+
+    print(f"Описания из корпуса ({len(descriptions)} шт.):")
+    old = bench("re.sub (прежняя)", legacy_escape_markdown, descriptions, 20)
+    new = bench("markdown_escape", escape_markdown, descriptions, 20)
+    print(f"  ускорение: x{old / new:.1f}")
+
+    # Так описание отдаёт бот: сообщение отрендерено при старте, на запрос - только срез страницы
+    prerender_all()
+    slots = list(range(SLOT_COUNT))
+    ready = bench("description_page (готовое)", description_page, slots, 20)
+    print(f"  готовое сообщение против re.sub: x{old / ready:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Пиковая память и время сборки отчёта .txt: прежняя склейка через += против потоковой записи
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.bench_report
+#
+# В конце отчёт загружается через python-telegram-bot в заглушку Bot API, как это делает
+# send_results_as_file: маленький отчёт (и новый, и из кеша тел) не должен попасть на диск.
+import asyncio
+import io
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+
+from telegram import Bot, InputFile
+
+from benchmarks.fake_bot_api import FakeBotApi
+from cashka_preprocessor import PersonalityProcessor, warm_cache
+from pgd_bot import PGD_Person_Mod
+from report import REPORT_SPOOL_MAX_SIZE, ReportBodyCache, chart_report_file, write_report
+
+DATES = ['09.10.1988', '01.01.1950', '29.02.2000', '31.12.1999', '15.07.1975']
+
+
+def legacy_format_results_for_download(name: str, dob: datetime, results: dict, tasks: dict, periods: dict) -> str:
+    """Реализация bot.format_results_for_download до выноса в report."""
+    header = (
+        f"Анализ личности\n{'='*20}\n"
+        f"Имя: {name}\nДата рождения: {dob.strftime('%d.%m.%Y')}\n{'='*20}\n"
+    )
+    tasks_content = "\n--- Задачи по Матрице ---\n"
+    if tasks:
+        for key, value in tasks.items():
+            tasks_content += f"{key}: {value if value is not None else '-'}\n"
+    periods_content = "\n--- Бизнес Периоды ---\n"
+    if periods and "Бизнес периоды" in periods:
+        for key, value in periods["Бизнес периоды"].items():
+            periods_content += f"{key}: {value if value is not None else '-'}\n"
+    main_content = "\n--- Подробное описание ---\n"
+    for key, value in results.items():
+        clean_value = value.replace('**', '').replace('*', '').replace('\n\n', '\n')
+        main_content += f"\n--- {key} ---\n{clean_value}\n"
+    return header + tasks_content + periods_content + main_content
+
+
+def legacy_download(date: str, sex: str) -> int:
+    """Прежний путь: словарь описаний, строка отчёта и bytes для отправки."""
+    person = PGD_Person_Mod('Анна', date, sex)
+    results = PersonalityProcessor.from_chart(person.chart).get_full_description()
+    text = legacy_format_results_for_download('Анна', datetime.strptime(date, '%d.%m.%Y'), results,
+                                              person.tasks(), person.periods_person())
+    return len(text.encode('utf-8'))
+
+
+def streaming_download(date: str, sex: str) -> int:
+    report = chart_report_file('Анна', date, PGD_Person_Mod('Анна', date, sex).chart)
+    try:
+        report.seek(0, 2)
+        return report.tell()
+    finally:
+        report.close()
+
+
+def measure(func, *args) -> tuple:
+    """(пик выделенной памяти в байтах, секунды, результат)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, seconds, result
+
+
+def large_report(sections: int, section_size: int, streaming: bool) -> int:
+    """Синтетический отчёт из многих разделов: проверка, что пик не растёт с размером."""
+    descriptions = ((f"Раздел {i}", "Описание раздела. " * (section_size // 18)) for i in range(sections))
+    if streaming:
+        with SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE, mode='w+b') as report:
+            return write_report(report, 'Анна', '09.10.1988', descriptions, {}, {})
+    text = legacy_format_results_for_download('Анна', datetime(1988, 10, 9), dict(descriptions), {}, {})
+    return len(text.encode('utf-8'))
+
+
+def _on_disk(report) -> bool:
+    """Лежит ли файл отчёта на диске: SpooledTemporaryFile после переноса или обычный временный файл."""
+    return getattr(report, '_rolled', not isinstance(report, io.BytesIO))
+
+
+async def check_upload_in_memory() -> list:
+    """Загружает маленький отчёт дважды (второй раз тело из кеша) и проверяет, что он остался в памяти."""
+    api = FakeBotApi()
+    base_url = await api.start()
+    bodies = ReportBodyCache()
+    chart = PGD_Person_Mod('Анна', DATES[0], 'Ж').chart
+    errors = []
+    try:
+        async with Bot('1:benchmark', base_url=base_url) as bot:
+            for attempt in ('новый', 'из кеша'):
+                report = chart_report_file('Анна', DATES[0], chart, bodies)
+                try:
+                    document = InputFile(report, filename='report.txt', read_file_handle=False)
+                    await bot.send_document(chat_id=1, document=document)
+                    if _on_disk(report):
+                        errors.append(f"отчёт ({attempt}) при загрузке перенесён на диск")
+                finally:
+                    report.close()
+    finally:
+        await api.stop()
+    return errors
+
+
+def main() -> None:
+    warm_cache()
+    legacy_download(DATES[0], 'Ж')  # прогрев: первый strptime импортирует _strptime
+    print("Отчёт по чашке (описания из корпуса):")
+    for date in DATES:
+        for sex in 'ЖМ':
+            old_peak, old_seconds, size = measure(legacy_download, date, sex)
+            new_peak, new_seconds, new_size = measure(streaming_download, date, sex)
+            assert size == new_size
+            print(f"  {date} {sex}: {size / 1024:6.1f} КБ   пик {old_peak / 1024:7.1f} -> {new_peak / 1024:7.1f} КБ"
+                  f"   {old_seconds * 1000:6.2f} -> {new_seconds * 1000:6.2f} мс")
+
+    print(f"Синтетический отчёт (граница спула {REPORT_SPOOL_MAX_SIZE // 1024} КБ):")
+    section_size = 8 * 1024
+    for sections in (50, 500, 2000):
+        old_peak, _, size = measure(large_report, sections, section_size, False)
+        new_peak, _, _ = measure(large_report, sections, section_size, True)
+        print(f"  {sections:5d} разделов, {size / 2 ** 20:6.1f} МБ: пик {old_peak / 2 ** 20:7.2f} -> "
+              f"{new_peak / 2 ** 20:5.2f} МБ")
+        # Потоковая запись держит в памяти не больше спула (при переносе на диск - его копию)
+        # и одного раздела в виде строк и байт
+        assert new_peak < 2 * REPORT_SPOOL_MAX_SIZE + 16 * section_size
+
+    errors = asyncio.run(check_upload_in_memory())
+    print(f"Загрузка маленького отчёта: {'; '.join(errors) if errors else 'в памяти'}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
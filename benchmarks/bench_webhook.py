@@ -0,0 +1,179 @@
+# Пропускная способность и задержки бота в режимах polling и webhook против заглушки Bot API
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.bench_webhook --users 200 --concurrency 50 --rtt 0.02
+#     python -m benchmarks.bench_webhook --mode webhook
+#     python -m benchmarks.bench_webhook --flood-every 20   # каждая 20-я отправка получает 429
+#
+# Каждый пользователь проходит /start, имя, дату и выбор пола. Задержка шага -
+# от отправки обновления до ответа бота, которого ждёт пользователь. Заглушка
+# Bot API и пользователи работают в дочернем процессе, бот - в основном.
+# Кроме задержек выводится процессорное время процесса бота на одно обновление.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+os.environ.setdefault('TOKEN_BOT', '1:benchmark')  # bot.py требует токен при импорте
+
+import bot  # noqa: E402
+from benchmarks.fake_bot_api import FakeBotApi  # noqa: E402
+from webhook import WebhookConfig, run_webhook  # noqa: E402
+
+MODES = ('polling', 'webhook')
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def wait_for(api: FakeBotApi, chat_id: int, predicate) -> None:
+    while True:
+        call = await api.wait_call(chat_id)
+        if predicate(call):
+            return
+
+
+def _is_descriptions_keyboard(call) -> bool:
+    return call.method == 'sendMessage' and 'DOWNLOAD_FILE' in str(call.params.get('reply_markup', ''))
+
+
+async def user_flow(api: FakeBotApi, user_id: int, rng: random.Random, latencies: dict) -> None:
+    date_str = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1940, 2010)}"
+    steps = (
+        ('start', api.message_update(user_id, '/start'), lambda c: c.method == 'sendMessage'),
+        ('name', api.message_update(user_id, 'Анна'), lambda c: c.method == 'sendMessage'),
+        ('date', api.message_update(user_id, date_str), lambda c: c.method == 'sendMessage'),
+        ('gender', api.callback_update(user_id, rng.choice('ЖМ')), _is_descriptions_keyboard),
+    )
+    for step, update, predicate in steps:
+        started = time.perf_counter()
+        await api.push_update(update)
+        await wait_for(api, user_id, predicate)
+        latencies[step].append(time.perf_counter() - started)
+
+
+async def run_users(api: FakeBotApi, users: int, concurrency: int) -> tuple:
+    latencies = {step: [] for step in ('start', 'name', 'date', 'gender')}
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(0)
+
+    async def one(user_id: int) -> None:
+        async with semaphore:
+            await user_flow(api, user_id, rng, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(1000 + i) for i in range(users)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_driver(users: int, concurrency: int, rtt: float, flood_every: int) -> None:
+    """
+    Дочерний процесс: заглушка Bot API и пользователи. Порт печатается первой строкой,
+    результаты - последней (JSON). Telegram не делит процессор с ботом, поэтому и заглушка
+    работает в отдельном процессе.
+    """
+    api = FakeBotApi(rtt=rtt, flood_every=flood_every)
+    base_url = await api.start()
+    print(base_url, flush=True)
+    # Бот готов, когда начал опрашивать getUpdates или зарегистрировал webhook
+    while not api.calls['getUpdates'] and api.webhook_url is None:
+        await asyncio.sleep(0.01)
+    latencies, seconds = await run_users(api, users, concurrency)
+    print(json.dumps({'latencies': latencies, 'seconds': seconds, 'calls': dict(api.calls)}), flush=True)
+    # Заглушка отвечает, пока бот не остановлен: родитель закрывает stdin после остановки
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+    await api.stop()
+
+
+async def bench_mode(mode: str, users: int, concurrency: int, rtt: float, flood_every: int) -> None:
+    driver = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'benchmarks.bench_webhook', '--driver', '--users', str(users),
+        '--concurrency', str(concurrency), '--rtt', str(rtt), '--flood-every', str(flood_every),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+    base_url = (await driver.stdout.readline()).decode().strip()
+    application = bot.build_application(base_url=base_url)
+    cpu_started = _cpu_seconds()
+
+    if mode == 'polling':
+        await application.initialize()
+        await application.start()
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+        try:
+            output = await driver.stdout.readline()
+        finally:
+            await application.updater.stop()
+            await application.stop()
+            await application.shutdown()
+    else:
+        port = await _free_port()
+        config = WebhookConfig(url=f'http://127.0.0.1:{port}/telegram', listen='127.0.0.1', port=port,
+                               path='/telegram', secret_token='benchmark')
+        stop_event = asyncio.Event()
+        server = asyncio.create_task(run_webhook(application, config, stop_event=stop_event))
+        try:
+            output = await driver.stdout.readline()
+        finally:
+            stop_event.set()
+            await server
+    cpu_seconds = _cpu_seconds() - cpu_started
+    driver.stdin.close()
+    await driver.wait()
+
+    result = json.loads(output)
+    seconds, calls = result['seconds'], result['calls']
+    print(f"{mode}: {users} пользователей за {seconds:.2f} с ({users * 4 / seconds:.0f} обновлений/с), "
+          f"вызовов API: {sum(calls.values()) - calls.get('getUpdates', 0)}, getUpdates: {calls.get('getUpdates', 0)}, "
+          f"ответов 429: {calls.get('429', 0)}")
+    # На одной машине заглушка и бот делят процессор, поэтому честнее сравнивать
+    # процессорное время самого бота на одно обновление
+    print(f"  процессор бота: {cpu_seconds / (users * 4) * 1000:.2f} мс на обновление")
+    for step, values in result['latencies'].items():
+        print(f"  {step:<7} p50 {statistics.median(values) * 1000:7.1f} мс   "
+              f"p99 {percentile(values, 99) * 1000:7.1f} мс")
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def _free_port() -> int:
+    server = await asyncio.start_server(lambda r, w: None, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    server.close()
+    await server.wait_closed()
+    return port
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк polling против webhook")
+    parser.add_argument('--mode', choices=MODES, help="по умолчанию оба режима")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--rtt', type=float, default=0.02, help="сетевая задержка до Bot API, с")
+    parser.add_argument('--flood-every', type=int, default=0, help="отвечать 429 на каждую N-ю отправку")
+    parser.add_argument('--driver', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.driver:
+        asyncio.run(run_driver(args.users, args.concurrency, args.rtt, args.flood_every))
+        return
+
+    bot.warm_cache()
+    bot.prerender_all()
+    for mode in ([args.mode] if args.mode else MODES):
+        asyncio.run(bench_mode(mode, args.users, args.concurrency, args.rtt, args.flood_every))
+
+
+if __name__ == "__main__":
+    main()
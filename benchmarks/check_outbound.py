@@ -0,0 +1,138 @@
+# Проверки исходящей очереди (outbound.OutboundScheduler) без сети
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.check_outbound
+#
+# 1. Очередь одного чата не задерживает первое сообщение в другой чат.
+# 2. Правки одного сообщения склеиваются только в пределах одного метода,
+#    а отмена одного из ждущих не отменяет правку для остальных.
+# 3. Один пользователь, проходящий /start -> имя -> дата -> пол -> описание
+#    против заглушки Bot API, не ждёт очереди ни разу.
+# Код выхода 1, если хоть одна проверка не прошла.
+import asyncio
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault('TOKEN_BOT', '1:benchmark')  # bot.py требует токен при импорте
+
+import bot  # noqa: E402
+from benchmarks.fake_bot_api import FakeBotApi  # noqa: E402
+from outbound import OutboundScheduler  # noqa: E402
+
+
+class _Calls:
+    """Заглушка callback для process_request: запоминает отправленные вызовы."""
+
+    def __init__(self):
+        self.sent = []
+
+    def callback(self, label: str):
+        async def send():
+            self.sent.append(label)
+            return label
+        return send
+
+
+async def check_other_chat_not_delayed() -> list:
+    scheduler = OutboundScheduler(chat_rate=1.0, chat_burst=3.0)
+    calls = _Calls()
+    busy = [asyncio.create_task(scheduler.process_request(calls.callback('a'), (), {}, 'sendMessage',
+                                                          {'chat_id': 1}, None))
+            for _ in range(6)]
+    await asyncio.sleep(0)
+    started = time.monotonic()
+    await scheduler.process_request(calls.callback('b'), (), {}, 'sendMessage', {'chat_id': 2}, None)
+    waited = time.monotonic() - started
+    for task in busy:
+        task.cancel()
+    await asyncio.gather(*busy, return_exceptions=True)
+    if waited > 0.05:
+        return [f"первое сообщение в другой чат ждало {waited:.2f} с"]
+    return []
+
+
+async def check_edit_coalescing() -> list:
+    errors = []
+    # Общий лимит 1 в секунду: первая отправка занимает маркер, правки встают в очередь
+    scheduler = OutboundScheduler(global_rate=1.0)
+    calls = _Calls()
+    await scheduler.process_request(calls.callback('send'), (), {}, 'sendMessage', {'chat_id': 1}, None)
+
+    def edit(method: str, label: str):
+        return asyncio.create_task(scheduler.process_request(
+            calls.callback(label), (), {}, method, {'chat_id': 1, 'message_id': 7}, None))
+
+    text_1 = edit('editMessageText', 'text-1')
+    markup = edit('editMessageReplyMarkup', 'markup')
+    await asyncio.sleep(0)
+    text_2 = edit('editMessageText', 'text-2')
+    await asyncio.sleep(0)
+    # Первый ждущий ушёл: правку всё равно должен получить второй
+    text_1.cancel()
+    results = await asyncio.gather(text_1, markup, text_2, return_exceptions=True)
+
+    if not isinstance(results[0], asyncio.CancelledError):
+        errors.append(f"отменённый ждущий получил {results[0]!r}")
+    if results[1] != 'markup':
+        errors.append(f"правка клавиатуры подменена: {results[1]!r}")
+    if results[2] != 'text-2':
+        errors.append(f"склеенная правка текста вернула {results[2]!r}")
+    if sorted(calls.sent) != ['markup', 'send', 'text-2']:
+        errors.append(f"отправлены вызовы {calls.sent}")
+    return errors
+
+
+async def _wait_for(api: FakeBotApi, chat_id: int, predicate):
+    while True:
+        call = await api.wait_call(chat_id, timeout=10)
+        if predicate(call):
+            return call
+
+
+async def check_single_user_flow() -> list:
+    api = FakeBotApi()
+    base_url = await api.start()
+    application = bot.build_application(base_url=base_url)
+    await application.initialize()
+    await application.start()
+    await application.updater.start_polling(poll_interval=0, timeout=1)
+    user_id = 1000
+    try:
+        is_send = lambda c: c.method == 'sendMessage'  # noqa: E731
+        for text in ('/start', 'Анна', '09.10.1988'):
+            await api.push_update(api.message_update(user_id, text))
+            await _wait_for(api, user_id, is_send)
+        await api.push_update(api.callback_update(user_id, 'Ж'))
+        keyboard = await _wait_for(api, user_id, lambda c: is_send(c) and 'DOWNLOAD_FILE' in str(c.params))
+        first_button = keyboard.params['reply_markup']['inline_keyboard'][0][0]['callback_data']
+        await api.push_update(api.callback_update(user_id, first_button))
+        await _wait_for(api, user_id, lambda c: c.method == 'editMessageText')
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        await api.stop()
+
+    delayed = bot.outbound_scheduler.delayed
+    return [f"один пользователь ждал очереди {delayed} раз"] if delayed else []
+
+
+async def run_checks() -> int:
+    failures = 0
+    for check in (check_other_chat_not_delayed, check_edit_coalescing, check_single_user_flow):
+        errors = await check()
+        failures += bool(errors)
+        print(f"{check.__name__}: {'ОК' if not errors else '; '.join(errors)}")
+    return failures
+
+
+def main() -> None:
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.prerender_all()
+    sys.exit(1 if asyncio.run(run_checks()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Заглушка Telegram Bot API для офлайн-бенчмарков
+#
+# Отвечает на методы, которые вызывает бот (getMe, getUpdates, setWebhook,
+# sendMessage, editMessageText, answerCallbackQuery, sendDocument и т.д.),
+# с искусственной сетевой задержкой rtt. Обновления для бота подаются через
+# push_update: в режиме polling они уходят в ответ на getUpdates, в режиме
+# webhook - POST-запросом на адрес из setWebhook, как это делает Telegram.
+# flood_every=N отвечает 429 с retry_after на каждую N-ю отправку сообщения.
+import asyncio
+import itertools
+import json
+import re
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl
+
+import httpx
+
+from webhook import HttpError, serve_http
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'PGD', 'username': 'pgd_bot'}
+_METHOD_RE = re.compile(r'^/bot[^/]+/(\w+)$')
+_CHAT_ID_RE = re.compile(rb'name="chat_id"\r\n\r\n(-?\d+)')
+
+
+class ApiCall:
+    __slots__ = ('method', 'params', 'at')
+
+    def __init__(self, method: str, params: dict):
+        self.method = method
+        self.params = params
+        self.at = time.perf_counter()
+
+
+class FakeBotApi:
+    def __init__(self, rtt: float = 0.0, flood_every: int = 0, retry_after: int = 1):
+        self.rtt = rtt
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self._sends = itertools.count(1)
+        self.webhook_url = None
+        self.webhook_secret = ''
+        self.calls = defaultdict(int)
+        self._updates = []
+        self._updates_ready = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._chat_events = defaultdict(asyncio.Queue)
+        self._callback_chats = {}
+        self._server = None
+        self._client = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Запускает сервер, возвращает base_url для Application.builder().base_url()."""
+        self._server = await serve_http(self.handle, host, port)
+        self._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=100))
+        return f"http://{host}:{self._server.sockets[0].getsockname()[1]}/bot"
+
+    async def stop(self) -> None:
+        self._updates_ready.set()
+        if self._client is not None:
+            await self._client.aclose()
+        if self._server is not None:
+            self._server.close()
+
+    # --- обновления для бота ---
+
+    async def push_update(self, update: dict) -> None:
+        update = {'update_id': next(self._update_ids), **update}
+        if self.webhook_url:
+            await asyncio.sleep(self.rtt / 2)
+            response = await self._client.post(self.webhook_url, json=update,
+                                               headers={'X-Telegram-Bot-Api-Secret-Token': self.webhook_secret})
+            response.raise_for_status()
+        else:
+            self._updates.append(update)
+            self._updates_ready.set()
+
+    async def wait_call(self, chat_id: int, timeout: float = 30.0) -> ApiCall:
+        """Следующий вызов бота, адресованный чату chat_id."""
+        return await asyncio.wait_for(self._chat_events[chat_id].get(), timeout)
+
+    # --- HTTP ---
+
+    async def handle(self, request) -> tuple:
+        match = _METHOD_RE.match(request.path)
+        if not match or request.method != 'POST':
+            raise HttpError(404)
+        method = match.group(1)
+        params = self._params(request)
+        self.calls[method] += 1
+
+        if method == 'getUpdates':
+            result = await self._get_updates(params)
+        else:
+            await asyncio.sleep(self.rtt)
+            if self.flood_every and method.startswith(('send', 'edit')) and next(self._sends) % self.flood_every == 0:
+                self.calls['429'] += 1
+                body = {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                        'parameters': {'retry_after': self.retry_after}}
+                return 429, json.dumps(body).encode('utf-8'), 'application/json'
+            result = self._result(method, params)
+            chat_id = params.get('chat_id')
+            if chat_id is None and method == 'answerCallbackQuery':
+                chat_id = self._callback_chats.pop(str(params.get('callback_query_id')), None)
+            if chat_id is not None:
+                self._chat_events[int(chat_id)].put_nowait(ApiCall(method, params))
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8'), 'application/json'
+
+    @staticmethod
+    def _params(request) -> dict:
+        content_type = request.headers.get('content-type', '')
+        if content_type.startswith('multipart/form-data'):
+            match = _CHAT_ID_RE.search(request.body)
+            return {'chat_id': int(match.group(1))} if match else {}
+        if content_type.startswith('application/json'):
+            return json.loads(request.body or b'{}')
+        params = {}
+        for key, value in parse_qsl(request.body.decode('utf-8')):
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+
+    async def _get_updates(self, params: dict) -> list:
+        offset = int(params.get('offset') or 0)
+        self._updates = [u for u in self._updates if u['update_id'] >= offset]
+        if not self._updates:
+            self._updates_ready.clear()
+            try:
+                await asyncio.wait_for(self._updates_ready.wait(), float(params.get('timeout') or 0))
+            except asyncio.TimeoutError:
+                return []
+        await asyncio.sleep(self.rtt / 2)
+        return list(self._updates)
+
+    def _result(self, method: str, params: dict):
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'setWebhook':
+            self.webhook_url = params.get('url')
+            self.webhook_secret = params.get('secret_token', '')
+            return True
+        if method == 'deleteWebhook':
+            self.webhook_url = None
+            return True
+        if method in ('sendMessage', 'editMessageText', 'sendDocument'):
+            message = {'message_id': params.get('message_id') or next(self._message_ids), 'date': int(time.time()),
+                       'chat': {'id': params.get('chat_id', 0), 'type': 'private'}, 'from': BOT_USER}
+            if method == 'sendDocument':
+                message['document'] = {'file_id': f"file{message['message_id']}", 'file_unique_id': 'u'}
+            else:
+                message['text'] = params.get('text', '')
+            return message
+        return True
+
+    # --- конструкторы обновлений ---
+
+    def message_update(self, user_id: int, text: str) -> dict:
+        message = {'message_id': next(self._message_ids), 'date': int(time.time()), 'text': text,
+                   'chat': {'id': user_id, 'type': 'private'},
+                   'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}}
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return {'message': message}
+
+    def callback_update(self, user_id: int, data: str) -> dict:
+        query_id = f'q{next(self._message_ids)}'
+        self._callback_chats[query_id] = user_id
+        return {'callback_query': {
+            'id': query_id, 'chat_instance': str(user_id), 'data': data,
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+            'message': {'message_id': next(self._message_ids), 'date': int(time.time()), 'text': '...',
+                        'chat': {'id': user_id, 'type': 'private'}, 'from': BOT_USER},
+        }}
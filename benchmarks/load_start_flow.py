@@ -0,0 +1,151 @@
+# Нагрузочный тест: параллельные сценарии /start через диспетчер python-telegram-bot
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.load_start_flow --users 500 --concurrency 100
+#
+# Обновления кладутся в очередь приложения, как их кладут polling и webhook, и проходят
+# обычный путь Application.process_update: ConversationHandler, block=False у обработчиков
+# с расчётом, исходящую очередь. Bot API - заглушка benchmarks.fake_bot_api с задержкой rtt.
+# Задержка шага с расчётом - от нажатия кнопки пола до списка кнопок с описаниями.
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault('TOKEN_BOT', '1:benchmark')  # bot.py требует токен при импорте
+
+from telegram import Update  # noqa: E402
+
+import bot  # noqa: E402
+from benchmarks.fake_bot_api import FakeBotApi  # noqa: E402
+from cashka_preprocessor import warm_cache  # noqa: E402
+from outbound import OutboundScheduler  # noqa: E402
+from pipeline import EXECUTOR_KINDS, PipelineExecutor, build_person_result  # noqa: E402
+
+BUSY_PREFIX = "⏳ Сейчас слишком много запросов"
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def wait_for(api: FakeBotApi, chat_id: int, predicate):
+    while True:
+        call = await api.wait_call(chat_id)
+        if predicate(call):
+            return call
+
+
+def _is_final(call) -> bool:
+    """Список кнопок с описаниями или отказ из-за переполненной очереди расчётов."""
+    if call.method != 'sendMessage':
+        return False
+    return 'DOWNLOAD_FILE' in str(call.params.get('reply_markup', '')) or call.params['text'].startswith(BUSY_PREFIX)
+
+
+async def start_flow(application, api: FakeBotApi, user_id: int, rng: random.Random) -> tuple:
+    """Один пользователь: /start, имя, дата, пол. Возвращает (задержка шага с расчётом, отказ ли)."""
+    async def push(update: dict) -> None:
+        await application.update_queue.put(Update.de_json({'update_id': 0, **update}, application.bot))
+
+    date_str = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1940, 2010)}"
+    for text in ('/start', 'Пользователь', date_str):
+        await push(api.message_update(user_id, text))
+        await wait_for(api, user_id, lambda c: c.method == 'sendMessage')
+
+    started = time.perf_counter()
+    await push(api.callback_update(user_id, rng.choice('ЖМ')))
+    final = await wait_for(api, user_id, _is_final)
+    return time.perf_counter() - started, final.params['text'].startswith(BUSY_PREFIX)
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.005) -> None:
+    """Насколько позже запланированного просыпается цикл событий."""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run_load(kind: str, users: int, concurrency: int, workers: int, max_pending: int, rtt: float,
+                   global_rate: float) -> dict:
+    api = FakeBotApi(rtt=rtt)
+    base_url = await api.start()
+    # Обработчики берут исполнитель и исходящую очередь из модуля bot во время вызова
+    bot.pipeline_executor = executor = PipelineExecutor(kind=kind, workers=workers, max_pending=max_pending)
+    bot.outbound_scheduler = OutboundScheduler(global_rate=global_rate)
+    application = bot.build_application(base_url=base_url)
+    await application.initialize()
+    await application.start()
+
+    # Прогрев: процессы пула поднимаются и читают корпус до замеров
+    await asyncio.gather(*(executor.run(build_person_result, 'x', '01.01.2000', 'Ж') for _ in range(workers)))
+
+    rng = random.Random(42)
+    gate = asyncio.Semaphore(concurrency)
+    latencies, rejected = [], 0
+
+    async def one_user(user_id: int):
+        nonlocal rejected
+        async with gate:
+            latency, busy = await start_flow(application, api, user_id, rng)
+            if busy:
+                rejected += 1
+            else:
+                latencies.append(latency)
+
+    stop, lags = asyncio.Event(), []
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one_user(1000 + i) for i in range(users)))
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+        await application.stop()
+        await application.shutdown()
+        await api.stop()
+
+    return {
+        'kind': kind,
+        'completed': len(latencies),
+        'rejected': rejected,
+        'flows_per_s': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else 0.0,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else 0.0,
+        'loop_lag_p99_ms': percentile(lags, 99) * 1000 if lags else 0.0,
+        'loop_lag_mean_ms': statistics.mean(lags) * 1000 if lags else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сценария /start")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-pending', type=int, default=256)
+    parser.add_argument('--rtt-ms', type=float, default=30.0, help="задержка одного вызова Bot API в заглушке")
+    parser.add_argument('--global-rate', type=float, default=1e6,
+                        help="общий лимит исходящей очереди; по умолчанию не ограничивает, заглушка не отвечает 429")
+    parser.add_argument('--kinds', default=','.join(EXECUTOR_KINDS))
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    warm_cache()
+    bot.prerender_all()
+    print(f"{'режим':<8} {'готово':>7} {'отказ':>6} {'пот/с':>8} {'p50 мс':>8} {'p99 мс':>8} {'лаг p99':>8}")
+    for kind in args.kinds.split(','):
+        stats = asyncio.run(run_load(kind, args.users, args.concurrency, args.workers,
+                                     args.max_pending, args.rtt_ms / 1000, args.global_rate))
+        print(f"{stats['kind']:<8} {stats['completed']:>7} {stats['rejected']:>6} {stats['flows_per_s']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['loop_lag_p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
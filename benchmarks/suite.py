@@ -0,0 +1,243 @@
+# Набор бенчмарков по этапам конвейера бота с сохранёнными базовыми значениями
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.suite                  # сравнить с benchmarks/baseline.json
+#     python -m benchmarks.suite --update         # перезаписать базовые значения
+#     python -m benchmarks.suite --threshold 0.5  # допустимое замедление 50 %
+#     python -m benchmarks.suite --only pair      # только этапы, в имени которых есть "pair"
+#
+# Работает без сети и без импорта bot (он поднимает пулы и хранилища). Код
+# возврата 1, если хоть один этап медленнее базового больше чем на threshold.
+# Этапы сравниваются не по абсолютному времени, а по отношению к калибровочному
+# циклу на чистом Python, снятому вплотную до и после замера этапа: нагрузка
+# соседей по машине замедляет оба, и отношение почти не меняется. В базе
+# калибровка хранится одним числом. Каждый этап - лучшее из повторов,
+# подозрительный этап перемеряется, а к порогу прибавляется шум калибровки
+# за запуск, чтобы кратковременная нагрузка не давала ложных регрессий.
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+
+from cashka_preprocessor import PersonalityProcessor, warm_cache
+from markdown_escape import escape_markdown
+from pgd_bot import PGD_Pair, PGD_Person_Mod
+from pipeline import build_person_result
+from report import format_results_for_download
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_THRESHOLD = float(os.getenv('PGD_BENCH_THRESHOLD', '0.25'))
+MIN_REPEAT_SECONDS = 0.05
+
+
+def sample_dates(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [(f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1940, 2010)}", rng.choice('ЖМ'))
+            for _ in range(count)]
+
+
+CALIBRATION_REPEAT = 25
+# Повторы калибровки вплотную к замеру этапа
+LOCAL_CALIBRATION_REPEAT = 5
+# Сколько раз перемерять этап, который выглядит регрессией: машина с соседями
+# бывает медленнее на 20-30 % по нескольку секунд, лучший из замеров это сглаживает
+RETRIES = 4
+
+
+def calibrate(repeat: int = CALIBRATION_REPEAT) -> float:
+    """Время фиксированного цикла на чистом Python, мкс (лучшее из repeat): оценка скорости машины."""
+    def loop():
+        total = 0
+        for i in range(20000):
+            total += i % 7
+        return total
+    return min(timeit.repeat(loop, number=10, repeat=repeat)) / 10 * 1e6
+
+
+def measure_relative(stage) -> tuple:
+    """Замер этапа и калибровка вплотную к нему: (мкс этапа, мкс калибровки)."""
+    before = calibrate(repeat=LOCAL_CALIBRATION_REPEAT)
+    us = stage()
+    return us, min(before, calibrate(repeat=LOCAL_CALIBRATION_REPEAT))
+
+
+def measure(func, samples: list, repeat: int) -> float:
+    """Лучшее по повторам время одного вызова func(sample), мкс: минимум меньше всего шумит."""
+    timer = timeit.Timer(lambda: [func(s) for s in samples])
+    # Каждый повтор не короче MIN_REPEAT_SECONDS, иначе минимум ловит шум
+    number, seconds = timer.autorange()
+    number = max(1, int(number * MIN_REPEAT_SECONDS / seconds))
+    times = timer.repeat(number=number, repeat=repeat)
+    return min(times) / (number * len(samples)) * 1e6
+
+
+def import_time(module: str, repeat: int) -> float:
+    """Время импорта модуля в чистом интерпретаторе, мкс (лучшее из repeat)."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        times.append(float(output.stdout))
+    return min(times) * 1e6
+
+
+def end_to_end(sample: tuple) -> str:
+    """/start целиком без Telegram: расчёт, сводка, описания и текст отчёта."""
+    date, sex = sample
+    result = build_person_result('Анна', date, sex)
+    chart = PGD_Person_Mod('Анна', date, sex).chart
+    descriptions = PersonalityProcessor.from_chart(chart).get_full_description()
+    return format_results_for_download('Анна', datetime.strptime(date, '%d.%m.%Y'), descriptions,
+                                       result['tasks_data'], result['periods_data'])
+
+
+def build_stages(repeat: int) -> dict:
+    """Имя этапа -> функция без аргументов, возвращающая мкс на вызов."""
+    persons = sample_dates(200)
+    partners = list(zip(persons, sample_dates(200, seed=1)))
+    charts = [PGD_Person_Mod('Анна', date, sex).chart for date, sex in persons[:50]]
+    descriptions = [PersonalityProcessor.from_chart(chart).get_full_description() for chart in charts]
+    reports = []
+    for (date, sex), description in zip(persons, descriptions):
+        person = PGD_Person_Mod('Анна', date, sex)
+        reports.append((datetime.strptime(date, '%d.%m.%Y'), description, person.tasks(), person.periods_person()))
+    labels = ["Карма рода. Наследственность, прошлый опыт).", "1-й период", "09.10.1988", 17]
+    texts = [text for description in descriptions[:10] for text in description.values()]
+
+    # Объекты создаются внутри вызова: кеш чашки в PGD_Person_Mod не должен искажать замер
+    return {
+        'person.calculate_points': lambda: measure(lambda s: PGD_Person_Mod('Анна', *s).calculate_points(),
+                                                   persons, repeat),
+        'person.tasks': lambda: measure(lambda s: PGD_Person_Mod('Анна', *s).tasks(), persons, repeat),
+        'person.periods_person': lambda: measure(lambda s: PGD_Person_Mod('Анна', *s).periods_person(),
+                                                 persons, repeat),
+        'pair.main_pair': lambda: measure(lambda p: PGD_Pair('А', p[0][0], 'Б', p[1][0]).main_pair(),
+                                          partners, repeat),
+        'pair.tasks_business': lambda: measure(lambda p: PGD_Pair('А', p[0][0], 'Б', p[1][0]).tasks_business(),
+                                               [p for p in partners if _has_business(p)], repeat),
+        'pair.all_sections': lambda: measure(_pair_sections, [p for p in partners if _has_business(p)], repeat),
+        'descriptions.get_full_description': lambda: measure(
+            lambda chart: PersonalityProcessor.from_chart(chart).get_full_description(), charts, repeat),
+        'bot.escape_markdown.labels': lambda: measure(escape_markdown, labels, repeat),
+        'bot.escape_markdown.descriptions': lambda: measure(escape_markdown, texts, repeat),
+        'bot.format_results_for_download': lambda: measure(
+            lambda r: format_results_for_download('Анна', *r), reports, repeat),
+        'import.personality_processor': lambda: import_time('personality_processor', max(3, repeat)),
+        'end_to_end.start_flow': lambda: measure(end_to_end, persons[:50], repeat),
+    }
+
+
+def _pair_sections(partners: tuple) -> tuple:
+    pair = PGD_Pair('А', partners[0][0], 'Б', partners[1][0])
+    return pair.main_pair(), pair.tasks(), pair.periods_pair(), pair.tasks_business()
+
+
+def _has_business(partners: tuple) -> bool:
+    # tasks_business исходного PGD_Pair падал, если у пары нет 4-го периода: выборка
+    # остаётся прежней, чтобы замеры сравнивались с базовыми
+    return PGD_Pair('А', partners[0][0], 'Б', partners[1][0]).periods_pair()["Бизнес периоды"]["4-й период"] is not None
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, calibration: float, results: dict) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'python': sys.version.split()[0],
+                   'calibration_us': round(calibration, 3),
+                   'stages': {name: {'us': round(us, 3)} for name, us in results.items()}},
+                  f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарки этапов бота")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое относительное замедление (0.25 = 25 %%)")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', help="подстрока в имени этапа")
+    parser.add_argument('--update', action='store_true', help="записать результаты как базовые")
+    args = parser.parse_args()
+
+    warm_cache()
+    calibrate()  # прогрев: первый замер после старта заметно медленнее
+    calibration = calibrate()
+    stored = load_baseline(args.baseline)
+    baseline, baseline_calibration = stored.get('stages', {}), stored.get('calibration_us')
+
+    stages = {name: stage for name, stage in build_stages(args.repeat).items()
+              if not args.only or args.only in name}
+    # relative - время этапа в калибровочных циклах, лучшее по попыткам
+    results, relative, seconds, calibrations = {}, {}, {}, [calibration]
+
+    def run(name: str) -> None:
+        started = time.perf_counter()
+        us, local = measure_relative(stages[name])
+        seconds[name] = seconds.get(name, 0) + time.perf_counter() - started
+        calibrations.append(local)
+        if name not in relative or us / local < relative[name]:
+            results[name], relative[name] = us, us / local
+
+    for name in stages:
+        run(name)
+    calibration = min(calibrations)
+    # Типичное замедление калибровки против лучшей за запуск - мера шума машины,
+    # на него порог расширяется. Медиана, а не максимум: один всплеск не отключает проверку
+    noise = statistics.median(calibrations) / calibration - 1
+    threshold = args.threshold + noise
+
+    def ratio(name: str):
+        if name not in baseline or not baseline_calibration:
+            return None
+        return relative[name] / (baseline[name]['us'] / baseline_calibration)
+
+    for name in stages:
+        # Подозрительный замер перемеряем с новой калибровкой и берём лучший
+        for _ in range(RETRIES):
+            current = ratio(name)
+            if current is None or current <= 1 + threshold:
+                break
+            run(name)
+
+    regressions = []
+    for name, value in results.items():
+        line = f"{name:<36} {value:12.2f} мкс"
+        current = ratio(name)
+        if current is not None:
+            line += f"   базовое {baseline[name]['us']:12.2f} мкс   x{current:.2f}"
+            if current > 1 + threshold:
+                line += "   РЕГРЕССИЯ"
+                regressions.append(name)
+        print(f"{line}   ({seconds[name]:.1f} с)")
+    print(f"Калибровка: {calibration:.1f} мкс, шум за запуск {noise:.0%}" +
+          (f" (в базе {baseline_calibration:.1f} мкс)" if baseline_calibration else ""))
+
+    if args.update:
+        # В базу этапы пишутся приведёнными к одной калибровке
+        reference = baseline_calibration if args.only and baseline_calibration else calibration
+        results = {name: value * reference for name, value in relative.items()}
+        if args.only and baseline_calibration:
+            # Остальные этапы остаются из базы
+            results = {**{name: ref['us'] for name, ref in baseline.items()}, **results}
+        save_baseline(args.baseline, reference, results)
+        print(f"Базовые значения записаны в {args.baseline}")
+    elif regressions:
+        print(f"Регрессия больше {threshold:.0%} (порог {args.threshold:.0%} + шум {noise:.0%}): "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 # Файл: telegram_bot.py (ПОЛНАЯ ПРАВИЛЬНАЯ ВЕРСИЯ)
 
+import asyncio
 import logging
 import os
-import re
 from datetime import datetime
 
 from dotenv import load_dotenv
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InputFile, Update
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
     CallbackQueryHandler,
@@ -15,11 +16,50 @@ from telegram.ext import (
     ContextTypes,
     ConversationHandler,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 
-from pgd_bot import PGD_Person_Mod
-from cashka_preprocessor import PersonalityProcessor
+from cashka_preprocessor import cleaned_description, cleaned_explanation, warm_cache
+from corpus_store import get_corpus
+from markdown_escape import escape_markdown
+from message_render import (
+    CALLBACK_PATTERN,
+    PAGE_CALLBACK_PATTERN,
+    description_callback_data,
+    description_key,
+    description_page,
+    is_prerendered,
+    page_callback_data,
+    parse_description_callback,
+    parse_page_callback,
+    prerender_all,
+    render_not_found,
+    split_markdown_v2,
+)
+from metrics import (
+    InstrumentedRequest,
+    cache_access,
+    count_error,
+    instrumented,
+    metrics_server_from_env,
+    observe_stage,
+    register_lru_cache,
+    registry,
+    timed,
+)
+from outbound import OutboundScheduler
+from pair_result import build_pair_text, compute_pair_result, pair_key, pair_results, swap_partners
+from pipeline import PipelineBusy, PipelineExecutor, build_person_result, chart_description_slots, chart_from_state
+from report import (
+    chart_report_file,
+    report_bodies,
+    report_file_ids,
+    report_file_key,
+    report_filename,
+)
+from state_store import state_store_from_env
+from webhook import WebhookConfig, run_webhook
 
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,36 +72,65 @@ if not BOT_TOKEN:
     exit()
 
 GET_NAME, GET_DOB, GET_GENDER, SHOW_DESCRIPTION = range(4)
-
-
-def escape_markdown(text: str) -> str:
-    if not isinstance(text, str):
-        text = str(text)
-    escape_chars = r'_*[]()~`>#+-.=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', text)
-
-def format_results_for_download(name: str, dob: datetime, results: dict, tasks: dict, periods: dict) -> str:
-    header = (
-        f"Анализ личности\n{'='*20}\n"
-        f"Имя: {name}\nДата рождения: {dob.strftime('%d.%m.%Y')}\n{'='*20}\n"
-    )
-    tasks_content = "\n--- Задачи по Матрице ---\n"
-    if tasks:
-        for key, value in tasks.items():
-            tasks_content += f"{key}: {value if value is not None else '-'}\n"
-    periods_content = "\n--- Бизнес Периоды ---\n"
-    if periods and "Бизнес периоды" in periods:
-        for key, value in periods["Бизнес периоды"].items():
-            periods_content += f"{key}: {value if value is not None else '-'}\n"
-    main_content = "\n--- Подробное описание ---\n"
-    for key, value in results.items():
-        clean_value = value.replace('**', '').replace('*', '').replace('\n\n', '\n')
-        main_content += f"\n--- {key} ---\n{clean_value}\n"
-    return header + tasks_content + periods_content + main_content
-
-
+PAIR_NAME, PAIR_DOB = range(4, 6)
+
+SESSION_EXPIRED_TEXT = "⌛ Результаты устарели. Чтобы рассчитать их заново, отправьте /start"
+
+# Расчёты выполняются вне цикла событий, чтобы не задерживать других пользователей
+pipeline_executor = PipelineExecutor.from_env()
+
+# Результаты хранятся как ключ чашки (имя, дата, пол), а не как готовые тексты
+state_store = state_store_from_env()
+
+registry.gauge('pgd_pipeline_in_flight', lambda: pipeline_executor.in_flight,
+               "Расчёты, которые выполняются или ждут исполнителя")
+# Все вызовы Bot API идут через общую очередь с лимитами Telegram
+outbound_scheduler = OutboundScheduler.from_env()
+
+registry.gauge('pgd_outbound_queue_depth', lambda: outbound_scheduler.queue_depth,
+               "Исходящие запросы, ждущие своей очереди по лимитам Telegram")
+registry.counter_func('pgd_outbound_coalesced_total', lambda: outbound_scheduler.coalesced,
+                      "Правки сообщений, поглощённые более новой правкой того же сообщения")
+registry.counter_func('pgd_outbound_retries_total', lambda: outbound_scheduler.retries,
+                      "Повторы запросов после RetryAfter")
+registry.counter_func('pgd_outbound_delayed_total', lambda: outbound_scheduler.delayed,
+                      "Исходящие запросы, которым пришлось ждать по лимитам")
+register_lru_cache('cleaned_description', cleaned_description)
+register_lru_cache('cleaned_explanation', cleaned_explanation)
+register_lru_cache('report_body', report_bodies)
+register_lru_cache('report_file_id', report_file_ids)
+register_lru_cache('pair_result', pair_results)
+
+
+def descriptions_keyboard(description_slots) -> InlineKeyboardMarkup:
+    """Кнопки с описаниями точек, скачиванием отчета и завершением."""
+    keyboard = [
+        [InlineKeyboardButton(text=description_key(slot), callback_data=description_callback_data(slot))]
+        for slot in description_slots
+    ]
+    keyboard.append([InlineKeyboardButton("📥 Скачать результат в .txt", callback_data="DOWNLOAD_FILE")])
+    keyboard.append([InlineKeyboardButton("✅ Завершить", callback_data="END_CONVERSATION")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def description_page_keyboard(slot: int, page: int, pages: int) -> InlineKeyboardMarkup:
+    """Листание страниц длинного описания и возврат к списку."""
+    keyboard = []
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(f"◀️ {page}/{pages}", callback_data=page_callback_data(slot, page - 1)))
+    if page + 1 < pages:
+        row.append(InlineKeyboardButton(f"Ещё ▶️ {page + 2}/{pages}", callback_data=page_callback_data(slot, page + 1)))
+    if row:
+        keyboard.append(row)
+    keyboard.append([InlineKeyboardButton("⬅️ Назад к списку", callback_data="BACK_TO_LIST")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+@instrumented
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data.clear()
+    state_store.delete(update.effective_user.id)
     await update.message.reply_text(
         r"👋 Здравствуйте\! Я бот для психологической диагностики\."
         r"\n\nЧтобы начать, пожалуйста, введите Ваше имя\.",
@@ -70,6 +139,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return GET_NAME
 
 
+@instrumented
 async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data['name'] = update.message.text
     await update.message.reply_text(
@@ -79,14 +149,17 @@ async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return GET_DOB
 
 
+@instrumented
 async def get_dob(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
-        context.user_data['dob'] = datetime.strptime(update.message.text, '%d.%m.%Y')
+        with timed('date_parse'):
+            context.user_data['dob'] = datetime.strptime(update.message.text, '%d.%m.%Y')
         keyboard = [[InlineKeyboardButton("Женский", callback_data="Ж"), InlineKeyboardButton("Мужской", callback_data="М")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(r"Спасибо\! Пожалуйста, выберите Ваш пол:", reply_markup=reply_markup)
         return GET_GENDER
     except ValueError:
+        count_error('date_format')
         await update.message.reply_text(
             r"❌ *Ошибка формата даты*\."
             r"\n\nПожалуйста, введите дату строго в формате *ДД\.ММ\.ГГГГ*\.",
@@ -101,6 +174,7 @@ async def get_dob(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 # Файл: telegram_bot.py
 # Замените старую функцию get_gender на эту:
 
+@instrumented
 async def get_gender(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -113,53 +187,31 @@ async def get_gender(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     date_str = user_data['dob'].strftime('%d.%m.%Y')
 
     try:
-        # Шаг 1: Выполняем расчеты
-        person_mod = PGD_Person_Mod(name, date_str, gender_char)
-        main_cup_data = person_mod.calculate_points()
-        tasks_data = person_mod.tasks()
-        periods_data = person_mod.periods_person()
-
-        # Шаг 2: Оборачиваем и передаем в процессор
-        wrapped_cup_data = {'Основная чашка': main_cup_data}
-        processor = PersonalityProcessor(wrapped_cup_data)
-        full_descriptions = processor.get_full_description()
-        
-        # Шаг 3: Сохраняем данные в сессию
-        context.user_data['full_descriptions'] = full_descriptions
-        context.user_data['tasks_data'] = tasks_data
-        context.user_data['periods_data'] = periods_data
-        
-        # --- ВОТ ВОССТАНОВЛЕННЫЙ БЛОК ---
-        header = f"*Результаты анализа для {escape_markdown(name)} \\({escape_markdown(date_str)}\\)*\n\n"
-        
-        # 1. Определяем переменную summary_text
-        summary_text = ""
-        
-        # 2. Наполняем ее данными
-        if tasks_data:
-            summary_text += "*Задачи по Матрице:*\n"
-            for key, val in tasks_data.items():
-                summary_text += f"_{escape_markdown(key)}_ `{escape_markdown(val) if val is not None else '-'}`\n"
-        if periods_data and "Бизнес периоды" in periods_data:
-            summary_text += "\n*Бизнес Периоды:*\n"
-            for key, val in periods_data["Бизнес периоды"].items():
-                summary_text += f"_{escape_markdown(key)}_: `{escape_markdown(val) if val is not None else '-'}`\n"
-        # --- КОНЕЦ ВОССТАНОВЛЕННОГО БЛОКА ---
-        
-        # 3. Теперь эта проверка корректна
+        # Шаг 1: Расчёты и форматирование сводки идут в пуле исполнителя
+        try:
+            result = await pipeline_executor.run(build_person_result, name, date_str, gender_char)
+        except PipelineBusy:
+            count_error('pipeline_busy')
+            logger.warning("Очередь расчётов переполнена, запрос отклонён")
+            await context.bot.send_message(chat_id=query.message.chat_id, text="⏳ Сейчас слишком много запросов. Попробуйте, пожалуйста, через минуту: /start")
+            return ConversationHandler.END
+
+        for stage, seconds in result['timings'].items():
+            observe_stage(stage, seconds)
+        description_slots = result['description_slots']
+        summary_text = result['summary_text']
+
+        # Шаг 2: Сохраняем только ключ чашки, описания по нему собираются заново
+        state_store.set(query.from_user.id, {'name': name, 'date': date_str, 'sex': gender_char})
+        # Дальше всё берётся из state_store: запись пользователя в user_data больше не нужна
+        context.application.drop_user_data(query.from_user.id)
+
         if summary_text:
-            await context.bot.send_message(chat_id=query.message.chat_id, text=header + summary_text, parse_mode=ParseMode.MARKDOWN_V2)
+            await context.bot.send_message(chat_id=query.message.chat_id, text=summary_text, parse_mode=ParseMode.MARKDOWN_V2)
         
         # Отправка кнопок с подробными описаниями
-        if full_descriptions:
-            description_keys = list(full_descriptions.keys())
-            keyboard = [
-                [InlineKeyboardButton(text=key, callback_data=f"key_{key}")]
-                for key in description_keys
-            ]
-            keyboard.append([InlineKeyboardButton("📥 Скачать результат в .txt", callback_data="DOWNLOAD_FILE")])
-            keyboard.append([InlineKeyboardButton("✅ Завершить", callback_data="END_CONVERSATION")])
-            reply_markup = InlineKeyboardMarkup(keyboard)
+        if description_slots:
+            reply_markup = descriptions_keyboard(description_slots)
             await context.bot.send_message(
                 chat_id=query.message.chat_id,
                 text="Выберите точку для получения подробного описания или скачайте полный отчет:",
@@ -171,99 +223,333 @@ async def get_gender(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             return await end_conversation(update, context)
 
     except Exception as e:
+        count_error(type(e).__name__)
         logger.error(f"Ошибка при расчете или отправке: {e}", exc_info=True)
         await context.bot.send_message(chat_id=query.message.chat_id, text=r"❌ Произошла внутренняя ошибка\. Попробуйте позже\.")
         return ConversationHandler.END
 
+@instrumented
 async def show_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
-    await query.answer()
-    MAX_MESSAGE_LENGTH = 4096
+    # Ответ на нажатие уходит параллельно с подготовкой и отправкой описания
+    answered = asyncio.create_task(query.answer())
+    try:
+        try:
+            # callback_data кодирует слот описания: индекс точки и её значение
+            slot = parse_description_callback(query.data)
+        except ValueError:
+            count_error('callback_data')
+            await query.edit_message_text(text="❌ Ошибка данных кнопки.")
+            return SHOW_DESCRIPTION
+        selected_key = description_key(slot)
+
+        state = state_store.get(query.from_user.id)
+        cache_access('state', state is not None)
+        if state is None:
+            await query.edit_message_text(text=SESSION_EXPIRED_TEXT)
+            return ConversationHandler.END
+
+        # Текст сообщения отрендерен и разбит на страницы заранее, остаётся взять первую
+        with timed('description'):
+            if slot in chart_description_slots(chart_from_state(state)):
+                cache_access('rendered_description', is_prerendered(slot))
+                message_text, pages = description_page(slot)
+            else:
+                message_text, pages = render_not_found(selected_key), 1
+
+        await _edit_description(query, selected_key, message_text, description_page_keyboard(slot, 0, pages))
+        return SHOW_DESCRIPTION
+    finally:
+        await answered
+
 
+@instrumented
+async def show_description_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Кнопки "Ещё" и "◀️" длинного описания: страница берётся по готовым смещениям."""
+    query = update.callback_query
+    answered = asyncio.create_task(query.answer())
     try:
-        # ПРАВИЛЬНАЯ ЛОГИКА: извлекаем ключ из callback_data
-        selected_key = query.data.split('_', 1)[1]
-    except IndexError:
-        await query.edit_message_text(text="❌ Ошибка данных кнопки.")
+        try:
+            slot, page = parse_page_callback(query.data)
+        except ValueError:
+            count_error('callback_data')
+            await query.edit_message_text(text="❌ Ошибка данных кнопки.")
+            return SHOW_DESCRIPTION
+        selected_key = description_key(slot)
+
+        # Как и в show_description: описания только из чашки текущего диалога
+        state = state_store.get(query.from_user.id)
+        cache_access('state', state is not None)
+        if state is None:
+            await query.edit_message_text(text=SESSION_EXPIRED_TEXT)
+            return ConversationHandler.END
+
+        try:
+            with timed('description_page'):
+                if slot in chart_description_slots(chart_from_state(state)):
+                    message_text, pages = description_page(slot, page)
+                else:
+                    message_text, page, pages = render_not_found(selected_key), 0, 1
+        except IndexError:
+            count_error('callback_data')
+            await query.edit_message_text(text="❌ Ошибка данных кнопки.")
+            return SHOW_DESCRIPTION
+
+        await _edit_description(query, selected_key, message_text, description_page_keyboard(slot, page, pages))
         return SHOW_DESCRIPTION
+    finally:
+        await answered
 
-    full_descriptions = context.user_data.get('full_descriptions', {})
-    description_text = full_descriptions.get(selected_key, "Описание для этой точки не было найдено.")
-    
-    formatted_value = description_text.replace('**', '*').replace('\n\n', '\n')
-    message_text = f"*{escape_markdown(selected_key)}*\n\n{escape_markdown(formatted_value)}"
-    
-    keyboard = [[InlineKeyboardButton("⬅️ Назад к списку", callback_data="BACK_TO_LIST")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+
+async def _edit_description(query, key: str, message_text: str, reply_markup: InlineKeyboardMarkup) -> None:
     try:
-        if len(message_text) > MAX_MESSAGE_LENGTH:
-            cutoff_point = MAX_MESSAGE_LENGTH - 200
-            message_text = message_text[:cutoff_point] + (r"\n\n\.\.\." r"\n\n*\[Полная версия в файле для скачивания\]*")
         await query.edit_message_text(text=message_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2)
     except Exception as e:
-        logger.error(f"Не удалось отправить описание для ключа '{selected_key}': {e}", exc_info=True)
+        count_error(type(e).__name__)
+        logger.error(f"Не удалось отправить описание для ключа '{key}': {e}", exc_info=True)
         await query.edit_message_text(text=r"❌ Ошибка отображения\. Скачайте полный отчет в виде файла\.", reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2)
-    
-    return SHOW_DESCRIPTION
 
 
+@instrumented
 async def back_to_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    full_descriptions = context.user_data.get('full_descriptions', {})
+    state = state_store.get(query.from_user.id)
+    cache_access('state', state is not None)
+    if state is None:
+        await query.edit_message_text(text=SESSION_EXPIRED_TEXT)
+        return ConversationHandler.END
+    description_slots = chart_description_slots(chart_from_state(state))
     
-    if full_descriptions:
-        # ПРАВИЛЬНАЯ ЛОГИКА: создаем кнопки так же, как в get_gender
-        keyboard = [
-            [InlineKeyboardButton(text=key, callback_data=f"key_{key}")]
-            for key in full_descriptions.keys()
-        ]
-        keyboard.append([InlineKeyboardButton("📥 Скачать результат в .txt", callback_data="DOWNLOAD_FILE")])
-        keyboard.append([InlineKeyboardButton("✅ Завершить", callback_data="END_CONVERSATION")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    if description_slots:
+        # Кнопки те же, что и в get_gender
+        reply_markup = descriptions_keyboard(description_slots)
         await query.edit_message_text(text="Выберите точку для получения подробного описания:", reply_markup=reply_markup)
     else:
         await query.edit_message_text("Список описаний пуст.")
     return SHOW_DESCRIPTION
 
 
-# Функции send_results_as_file, end_conversation, cancel остаются без изменений...
+@instrumented
 async def send_results_as_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    # ...
+    query = update.callback_query
+    await query.answer()
+    state = state_store.get(query.from_user.id)
+    cache_access('state', state is not None)
+    if state is None:
+        await query.edit_message_text(text=SESSION_EXPIRED_TEXT)
+        return ConversationHandler.END
+
+    chart = chart_from_state(state)
+    file_key = report_file_key(state['name'], state['date'], chart)
+    file_id = report_file_ids.get(file_key)
+    if file_id is not None:
+        # Такой документ уже загружался: отправляем по file_id без генерации и загрузки
+        try:
+            await context.bot.send_document(chat_id=query.message.chat_id, document=file_id)
+            return SHOW_DESCRIPTION
+        except BadRequest as e:
+            logger.warning(f"file_id отчёта больше не действует, загружаем заново: {e}")
+            report_file_ids.discard(file_key)
+
+    with timed('report'):
+        report = chart_report_file(state['name'], state['date'], chart)
+    try:
+        # read_file_handle=False: файл читается по частям при отправке, а не целиком в bytes
+        document = InputFile(report, filename=report_filename(state['name'], state['date']), read_file_handle=False)
+        message = await context.bot.send_document(chat_id=query.message.chat_id, document=document)
+        if message.document is not None:
+            report_file_ids.set(file_key, message.document.file_id)
+    except Exception as e:
+        count_error(type(e).__name__)
+        logger.error(f"Не удалось отправить отчёт: {e}", exc_info=True)
+        await context.bot.send_message(chat_id=query.message.chat_id, text="❌ Не удалось отправить файл. Попробуйте позже.")
+    finally:
+        report.close()
     return SHOW_DESCRIPTION
+
+
+@instrumented
+async def pair_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    context.user_data.clear()
+    context.user_data['pair'] = []
+    await update.message.reply_text(
+        r"👫 Совместная диагностика пары\."
+        r"\n\nВведите имя первого партнёра\.",
+        parse_mode=ParseMode.MARKDOWN_V2
+    )
+    return PAIR_NAME
+
+
+@instrumented
+async def pair_get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    context.user_data['pair_name'] = update.message.text
+    await update.message.reply_text(
+        rf"Введите дату рождения: {escape_markdown(update.message.text)}, в формате *ДД\.ММ\.ГГГГ*\.",
+        parse_mode=ParseMode.MARKDOWN_V2
+    )
+    return PAIR_DOB
+
+
+@instrumented
+async def pair_get_dob(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    try:
+        with timed('date_parse'):
+            date_str = datetime.strptime(update.message.text, '%d.%m.%Y').strftime('%d.%m.%Y')
+    except ValueError:
+        count_error('date_format')
+        await update.message.reply_text(
+            r"❌ *Ошибка формата даты*\."
+            r"\n\nПожалуйста, введите дату строго в формате *ДД\.ММ\.ГГГГ*\.",
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+        return PAIR_DOB
+
+    partners = context.user_data['pair']
+    partners.append((context.user_data.pop('pair_name'), date_str))
+    if len(partners) == 1:
+        await update.message.reply_text(r"Спасибо\! Теперь введите имя второго партнёра\.", parse_mode=ParseMode.MARKDOWN_V2)
+        return PAIR_NAME
+
+    context.application.drop_user_data(update.effective_user.id)
+    (name_1, date_1), (name_2, date_2) = partners
+    try:
+        # Результат не зависит от порядка партнёров: пару, которую спрашивают
+        # с другой стороны, берём из кеша и лишь меняем местами задачи партнёров
+        key, swapped = pair_key(date_1, date_2)
+        result = pair_results.get(key)
+        cache_access('pair_result', result is not None)
+        if result is None:
+            try:
+                result = await pipeline_executor.run(compute_pair_result, *((date_2, date_1) if swapped else (date_1, date_2)))
+            except PipelineBusy:
+                count_error('pipeline_busy')
+                logger.warning("Очередь расчётов переполнена, запрос отклонён")
+                await update.message.reply_text("⏳ Сейчас слишком много запросов. Попробуйте, пожалуйста, через минуту: /pair")
+                return ConversationHandler.END
+            pair_results.put(key, result)
+        if swapped:
+            result = swap_partners(result)
+
+        with timed('pair_render'):
+            text = build_pair_text(name_1, date_1, name_2, date_2, result)
+        # Сообщения одного ответа отправляются по порядку
+        for chunk_start, chunk_end in split_markdown_v2(text):
+            await update.message.reply_text(text[chunk_start:chunk_end], parse_mode=ParseMode.MARKDOWN_V2)
+    except Exception as e:
+        count_error(type(e).__name__)
+        logger.error(f"Ошибка при расчете пары: {e}", exc_info=True)
+        await update.message.reply_text(r"❌ Произошла внутренняя ошибка\. Попробуйте позже\.", parse_mode=ParseMode.MARKDOWN_V2)
+    return ConversationHandler.END
+
+
+# Функции end_conversation, cancel остаются без изменений...
+@instrumented
 async def end_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # ...
     return ConversationHandler.END
+@instrumented
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # ...
     return ConversationHandler.END
 
 
-def main() -> None:
-    application = Application.builder().token(BOT_TOKEN).build()
+async def drop_conversation_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Разговор истёк (conversation_timeout): недовведённые имя и дата больше не нужны."""
+    if update.effective_user is not None:
+        context.application.drop_user_data(update.effective_user.id)
+
 
+async def _shutdown_executor(application: Application) -> None:
+    pipeline_executor.shutdown()
+    state_store.close()
+
+
+def build_application(token: str = BOT_TOKEN, base_url: str = None) -> Application:
+    """
+    Приложение со всеми обработчиками. Обновления обрабатываются по одному: на этом
+    держится ConversationHandler. Параллельно работают только обработчики с block=False.
+    PGD_CONCURRENT_UPDATES больше 1 снимает это ограничение, и два быстрых нажатия одной
+    кнопки могут обработаться дважды. base_url - адрес Bot API, для бенчмарков с локальной заглушкой.
+    """
+    builder = (
+        Application.builder().token(token).request(InstrumentedRequest())
+        .concurrent_updates(int(os.getenv('PGD_CONCURRENT_UPDATES', '1')))
+        .rate_limiter(outbound_scheduler)
+        .post_shutdown(_shutdown_executor)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+
+    # Обработчики с расчётом в пуле исполнителя и отправкой файла не блокируют очередь
+    # обновлений (block=False): пока они работают, бот обслуживает других пользователей,
+    # а разговор этого пользователя ждёт их завершения, и повторные нажатия не обрабатываются.
+    # Разговор живёт столько же, сколько состояние в state_store (PGD_STATE_TTL), иначе
+    # ConversationHandler помнил бы каждого пользователя, когда-либо открывшего бота
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
+        entry_points=[CommandHandler("start", start), CommandHandler("pair", pair_start)],
         states={
             GET_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_name)],
             GET_DOB: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_dob)],
-            GET_GENDER: [CallbackQueryHandler(get_gender, pattern="^Ж$|^М$")],
+            GET_GENDER: [CallbackQueryHandler(get_gender, pattern="^Ж$|^М$", block=False)],
             SHOW_DESCRIPTION: [
                 CallbackQueryHandler(back_to_list, pattern="^BACK_TO_LIST$"),
                 CallbackQueryHandler(end_conversation, pattern="^END_CONVERSATION$"),
-                CallbackQueryHandler(send_results_as_file, pattern="^DOWNLOAD_FILE$"),
-                # ПРАВИЛЬНАЯ ЛОГИКА: паттерн для распознавания кнопок
-                CallbackQueryHandler(show_description, pattern=r"^key_")
+                CallbackQueryHandler(send_results_as_file, pattern="^DOWNLOAD_FILE$", block=False),
+                # Кнопки описаний: callback_data вида "d<точка>:<значение>", страницы - "p<точка>:<значение>:<страница>"
+                CallbackQueryHandler(show_description, pattern=CALLBACK_PATTERN),
+                CallbackQueryHandler(show_description_page, pattern=PAGE_CALLBACK_PATTERN),
             ],
+            PAIR_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, pair_get_name)],
+            PAIR_DOB: [MessageHandler(filters.TEXT & ~filters.COMMAND, pair_get_dob, block=False)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, drop_conversation_data)],
         },
-        fallbacks=[CommandHandler("cancel", cancel)],
+        # /pair можно начать из любого шага личной диагностики
+        fallbacks=[CommandHandler("cancel", cancel), CommandHandler("pair", pair_start)],
+        conversation_timeout=state_store.ttl,
     )
 
     application.add_handler(conv_handler)
-    print("Бот запущен...")
-    application.run_polling()
+    # Кнопки под уже выданными результатами после перезапуска бота или истечения разговора:
+    # разговора нет, но состояние есть в state_store (например, в SQLite), и обработчики берут его оттуда
+    application.add_handlers([
+        CallbackQueryHandler(back_to_list, pattern="^BACK_TO_LIST$"),
+        CallbackQueryHandler(send_results_as_file, pattern="^DOWNLOAD_FILE$", block=False),
+        CallbackQueryHandler(show_description, pattern=CALLBACK_PATTERN),
+        CallbackQueryHandler(show_description_page, pattern=PAGE_CALLBACK_PATTERN),
+    ])
+    return application
+
+
+def health_info() -> dict:
+    """Дополнительные поля для /healthz в режиме webhook."""
+    return {'pipeline_in_flight': pipeline_executor.in_flight}
+
+
+def main() -> None:
+    # Корпус открывается сразу, чтобы предупреждение о несобранном файле было видно при запуске.
+    # Тексты декодируются и рендерятся при первом запросе; PGD_PREWARM=1 делает это заранее
+    # для всех ключей (быстрее первые ответы, но весь корпус в памяти и дольше запуск)
+    get_corpus()
+    if os.getenv('PGD_PREWARM', '0') == '1':
+        warm_cache()
+        invalid = prerender_all()
+        if invalid:
+            logger.warning(f"Некорректных сообщений с описаниями: {len(invalid)}")
+    metrics_server_from_env()
+    application = build_application()
+
+    # PGD_MODE: polling (по умолчанию) или webhook, настройки webhook - в webhook.WebhookConfig
+    mode = os.getenv('PGD_MODE', 'polling')
+    print(f"Бот запущен ({mode})...")
+    if mode == 'webhook':
+        asyncio.run(run_webhook(application, WebhookConfig.from_env(), health=health_info))
+    elif mode == 'polling':
+        application.run_polling()
+    else:
+        raise ValueError(f"Неизвестный режим: {mode}")
 
 
 if __name__ == "__main__": 
-    main()
\ No newline at end of file
+    main()
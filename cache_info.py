@@ -0,0 +1,7 @@
+# Сводка по кешу в формате functools.lru_cache().cache_info()
+#
+# Её возвращают собственные кеши бота (отчёты, file_id, результаты пар), чтобы
+# metrics.register_lru_cache выгружал их так же, как кеши на lru_cache.
+from collections import namedtuple
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
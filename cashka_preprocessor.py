@@ -2,9 +2,72 @@
 # Файл: main.py
 
 # Импортируем словари с данными
-from personality_processor import chashka, main_points
+from corpus_store import chashka, main_points
+from functools import lru_cache
 import re
 
+NOT_FOUND_DESCRIPTION = "Описание для этой точки не найдено."
+
+_HEADING_RE = re.compile(r'^#+\s*')
+_SPACES_RE = re.compile(r' +')
+
+
+def clean_text(text: str) -> str:
+    """
+    Очищает строку от лишних пробелов,
+    переносов строк и повторяющихся пробелов,
+    делая её более читабельной.
+    """
+    if not isinstance(text, str):
+        return ""
+
+    # Шаг 1: Заменяем все переносы строк на один пробел.
+    # Это также заменяет группы переносов, как \n\n, на один пробел.
+    text = text.replace('\n', ' ')
+
+    # Шаг 2: Удаляем заголовки Markdown (#, ##, ### и т.д.)
+    # Здесь `^` будет соответствовать началу всей строки.
+    text = _HEADING_RE.sub('', text)
+
+    # Шаг 3: Удаляем множественные пробелы между словами, оставляя только один.
+    text = _SPACES_RE.sub(' ', text)
+
+    # Удаляем пробелы в начале и конце строки и возвращаем результат
+    return text.strip()
+
+
+# Корпус статичен, поэтому очищенный текст считается один раз на ключ.
+# Ключей вида "Точка X = N" не больше 16 * 22, лимит только страхует от мусора на входе.
+@lru_cache(maxsize=1024)
+def cleaned_description(description_key: str) -> str:
+    """Очищенное описание из chashka по ключу вида "Точка X = N"."""
+    return clean_text(chashka.get(description_key, NOT_FOUND_DESCRIPTION))
+
+
+@lru_cache(maxsize=1024)
+def cleaned_explanation(point_name: str) -> str:
+    """Очищенное пояснение из main_points по имени точки."""
+    return clean_text(main_points.get(point_name, ""))
+
+
+def full_point_description(description_key: str) -> str:
+    """Описание точки вместе с пояснением, как его собирает PersonalityProcessor."""
+    point_name = description_key.split(' = ')[0]
+    value = cleaned_description(description_key)
+    explanation = cleaned_explanation(point_name)
+    if explanation and value != NOT_FOUND_DESCRIPTION:
+        return f"{explanation} {value}"
+    return value
+
+
+def warm_cache() -> None:
+    """Заранее очищает весь корпус, чтобы запросы сводились к поиску в кеше."""
+    for key in chashka:
+        cleaned_description(key)
+    for point_name in main_points:
+        cleaned_explanation(point_name)
+
+
 class PersonalityProcessor:
     """
     Класс для полной обработки словаря с точками личности,
@@ -26,6 +89,14 @@ class PersonalityProcessor:
         self.main_points_explanations = main_points
         self._final_result = None  # Для кеширования результата
 
+    @classmethod
+    def from_chart(cls, chart) -> "PersonalityProcessor":
+        """
+        Создаёт процессор по уже рассчитанной чашке (pgd_points.PersonChart),
+        не пересчитывая её.
+        """
+        return cls({'Основная чашка': chart.point_values()})
+
     def get_full_description(self) -> dict:
         """
         Выполняет всю цепочку обработки и возвращает итоговый словарь.
@@ -46,30 +117,9 @@ class PersonalityProcessor:
         self._final_result = full_descriptions
         return self._final_result
     
-    # --- Новый метод для очистки текста ---
     def _clean_text(self, text: str) -> str:
-        """
-        [Внутренний метод] Очищает строку от лишних пробелов,
-        переносов строк и повторяющихся пробелов,
-        делая её более читабельной.
-        """
-        if not isinstance(text, str):
-            return ""
-
-        # --- НОВАЯ ЛОГИКА ---
-        # Шаг 1: Заменяем все переносы строк на один пробел.
-        # Это также заменяет группы переносов, как \n\n, на один пробел.
-        text = text.replace('\n', ' ')
-
-        # Шаг 2: Удаляем заголовки Markdown (#, ##, ### и т.д.)
-        # Здесь `^` будет соответствовать началу всей строки.
-        text = re.sub(r'^#+\s*', '', text)
-        
-        # Шаг 3: Удаляем множественные пробелы между словами, оставляя только один.
-        text = re.sub(r' +', ' ', text)
-        
-        # Удаляем пробелы в начале и конце строки и возвращаем результат
-        return text.strip()
+        """[Внутренний метод] См. clean_text."""
+        return clean_text(text)
 
     def _dict_to_list(self) -> list:
         """[Внутренний метод] Преобразует cup_dict в список строк."""
@@ -93,10 +143,8 @@ class PersonalityProcessor:
             
             # Ключ для поиска в словаре chashka формируется с "= 1"
             description_key = f"{point_name} = {value_str}"
-            description = self.chashka_descriptions.get(description_key, "Описание для этой точки не найдено.")
-            
-            # Применяем очистку сразу после получения описания
-            final_dict[item] = self._clean_text(description)
+            # Описание берём уже очищенным из кеша
+            final_dict[item] = cleaned_description(description_key)
             
         return final_dict
 
@@ -105,13 +153,10 @@ class PersonalityProcessor:
         combined_dict = {}
         for key, value in descriptions_dict.items():
             point_name = key.split(' = ')[0]
-            explanation = self.main_points_explanations.get(point_name, "")
-            
-            # Применяем очистку к пояснению перед объединением
-            cleaned_explanation = self._clean_text(explanation)
+            explanation = cleaned_explanation(point_name)
             
-            if cleaned_explanation and value != "Описание для этой точки не найдено.":
-                combined_description = f"{cleaned_explanation} {value}"
+            if explanation and value != NOT_FOUND_DESCRIPTION:
+                combined_description = f"{explanation} {value}"
             else:
                 combined_description = value
                 
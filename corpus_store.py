@@ -0,0 +1,171 @@
+# Упакованный корпус текстов personality_processor с индексом смещений и чтением через mmap
+#
+# Файл собирается отдельным шагом при установке или сборке образа:
+#     python corpus_store.py build
+# Во время работы бот файл только читает. Если его нет, он старше
+# personality_processor.py или не читается, тексты берутся из словарей
+# personality_processor в памяти.
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('chashka', 'description_dict', 'main_points')
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(_BASE_DIR, 'personality_processor.py')
+# Путь можно вынести из каталога с кодом, например в каталог кеша образа
+CORPUS_PATH = os.getenv('PGD_CORPUS_PATH') or os.path.join(_BASE_DIR, 'personality_corpus.bin')
+
+# Формат файла: MAGIC, длина индекса (uint32 LE), индекс в JSON
+# ({раздел: {ключ: [смещение, длина]}}), затем тексты в UTF-8 подряд.
+MAGIC = b'PGDCORP1'
+_HEADER = struct.Struct('<I')
+
+
+def build_corpus(path: str = CORPUS_PATH) -> None:
+    """Собирает файл корпуса из словарей personality_processor."""
+    import personality_processor
+
+    index = {}
+    blob = bytearray()
+    for section in SECTIONS:
+        entries = {}
+        for key, text in getattr(personality_processor, section).items():
+            data = text.encode('utf-8')
+            entries[key] = [len(blob), len(data)]
+            blob += data
+        index[section] = entries
+
+    index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(index_bytes)))
+        f.write(index_bytes)
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def _is_stale(path: str) -> bool:
+    if not os.path.exists(path):
+        return True
+    if os.path.exists(SOURCE_PATH):
+        return os.path.getmtime(SOURCE_PATH) > os.path.getmtime(path)
+    return False
+
+
+class CorpusSection(Mapping):
+    """Раздел корпуса: декодирует текст только при обращении к ключу."""
+
+    def __init__(self, buffer, base: int, entries: dict):
+        self._buffer = buffer
+        self._base = base
+        self._entries = entries
+
+    def __getitem__(self, key: str) -> str:
+        offset, length = self._entries[key]
+        start = self._base + offset
+        return self._buffer[start:start + length].decode('utf-8')
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Corpus:
+    """Открытый файл корпуса, отображённый в память."""
+
+    def __init__(self, path: str = CORPUS_PATH):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Файл корпуса повреждён: {path}")
+        index_start = len(MAGIC) + _HEADER.size
+        (index_len,) = _HEADER.unpack_from(self._mmap, len(MAGIC))
+        index = json.loads(self._mmap[index_start:index_start + index_len].decode('utf-8'))
+        base = index_start + index_len
+        self.sections = {name: CorpusSection(self._mmap, base, entries) for name, entries in index.items()}
+
+
+class InMemoryCorpus:
+    """Те же разделы прямо из словарей personality_processor, когда файла корпуса нет."""
+
+    def __init__(self):
+        import personality_processor
+
+        self.sections = {name: getattr(personality_processor, name) for name in SECTIONS}
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def open_corpus(path: str = CORPUS_PATH):
+    """Corpus по собранному файлу или InMemoryCorpus, если файла нет, он устарел или не читается."""
+    if _is_stale(path):
+        logger.warning(f"Файл корпуса {path} не собран или устарел (python corpus_store.py build), "
+                       f"тексты читаются из personality_processor")
+        return InMemoryCorpus()
+    try:
+        return Corpus(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось открыть корпус {path}: {e}; тексты читаются из personality_processor")
+        return InMemoryCorpus()
+
+
+def get_corpus():
+    """Открывает корпус при первом обращении. Файл не пишется: его собирает python corpus_store.py build."""
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = open_corpus(CORPUS_PATH)
+    return _corpus
+
+
+class _LazySection(Mapping):
+    """Раздел, который открывает корпус только при первом чтении."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def _section(self) -> Mapping:
+        return get_corpus().sections[self._name]
+
+    def __getitem__(self, key: str) -> str:
+        return self._section()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._section()
+
+    def __iter__(self):
+        return iter(self._section())
+
+    def __len__(self) -> int:
+        return len(self._section())
+
+
+chashka = _LazySection('chashka')
+description_dict = _LazySection('description_dict')
+main_points = _LazySection('main_points')
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['build'] and len(sys.argv) <= 3:
+        path = sys.argv[2] if len(sys.argv) == 3 else CORPUS_PATH
+        build_corpus(path)
+        print(f"Корпус записан: {path} ({os.path.getsize(path)} байт)")
+    else:
+        print("Использование: python corpus_store.py build [путь, по умолчанию PGD_CORPUS_PATH или рядом с кодом]")
@@ -0,0 +1,17 @@
+# Экранирование текста для Telegram MarkdownV2
+
+ESCAPE_CHARS = r'_*[]()~`>#+-.=|{}.!'
+
+# Пары замен строятся один раз при импорте. Цепочка str.replace по русскому тексту
+# быстрее и re.sub, и str.translate (у последнего медленный путь для не-ASCII строк).
+# Обратная косая черта в набор не входит, поэтому повторного экранирования нет.
+_REPLACEMENTS = tuple((char, '\\' + char) for char in dict.fromkeys(ESCAPE_CHARS))
+
+
+def escape_markdown(text: str) -> str:
+    if not isinstance(text, str):
+        text = str(text)
+    for char, escaped in _REPLACEMENTS:
+        if char in text:
+            text = text.replace(char, escaped)
+    return text
@@ -0,0 +1,237 @@
+# Готовые тексты сообщений MarkdownV2 для каждого ключа описания "Точка X = N"
+import logging
+import sys
+
+from cashka_preprocessor import full_point_description
+from markdown_escape import ESCAPE_CHARS, escape_markdown
+from pgd_points import POINT_NAMES
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+# Запас под заголовок "*Точка X = N* (2/3)" на страницах после первой
+PAGE_HEADER_RESERVE = 100
+DESCRIPTION_NOT_FOUND = "Описание для этой точки не было найдено."
+
+# Сущности MarkdownV2, которые открываются и закрываются одним и тем же символом
+_ENTITY_CHARS = set('*_~`')
+
+# Слот описания: индекс точки в POINT_NAMES * 22 + значение точки.
+# В callback_data кнопки слот кодируется как "d<индекс точки>:<значение>".
+CALLBACK_PREFIX = 'd'
+CALLBACK_PATTERN = r'^d\d{1,2}:\d{1,2}$'
+# Страница длинного описания: "p<индекс точки>:<значение>:<номер страницы>"
+PAGE_CALLBACK_PREFIX = 'p'
+PAGE_CALLBACK_PATTERN = r'^p\d{1,2}:\d{1,2}:\d{1,2}$'
+SLOT_COUNT = len(POINT_NAMES) * 22
+
+_DESCRIPTION_KEYS = [f"{point_name} = {value}" for point_name in POINT_NAMES for value in range(22)]
+
+# Для каждого слота: полный текст MarkdownV2 и смещения его страниц [(начало, конец), ...]
+_rendered = [None] * SLOT_COUNT
+
+
+def description_slot(point_index: int, value: int) -> int:
+    """Номер слота описания для точки основной чашки с номером point_index и значением value."""
+    return point_index * 22 + value
+
+
+def description_callback_data(slot: int) -> str:
+    """Короткий callback_data для кнопки с описанием слота."""
+    point_index, value = divmod(slot, 22)
+    return f"{CALLBACK_PREFIX}{point_index}:{value}"
+
+
+def parse_description_callback(data: str) -> int:
+    """Номер слота из callback_data. ValueError, если данные не из description_callback_data."""
+    if not data.startswith(CALLBACK_PREFIX):
+        raise ValueError(f"Неизвестные данные кнопки: {data}")
+    point_index, value = map(int, data[len(CALLBACK_PREFIX):].split(':'))
+    if not (0 <= point_index < len(POINT_NAMES) and 0 <= value < 22):
+        raise ValueError(f"Неизвестные данные кнопки: {data}")
+    return description_slot(point_index, value)
+
+
+def description_key(slot: int) -> str:
+    """Ключ вида "Точка X = N" по номеру слота."""
+    return _DESCRIPTION_KEYS[slot]
+
+
+def page_callback_data(slot: int, page: int) -> str:
+    """callback_data кнопки перехода на страницу page описания слота."""
+    point_index, value = divmod(slot, 22)
+    return f"{PAGE_CALLBACK_PREFIX}{point_index}:{value}:{page}"
+
+
+def parse_page_callback(data: str) -> tuple:
+    """(слот, страница) из callback_data. ValueError, если данные не из page_callback_data."""
+    if not data.startswith(PAGE_CALLBACK_PREFIX):
+        raise ValueError(f"Неизвестные данные кнопки: {data}")
+    point_index, value, page = map(int, data[len(PAGE_CALLBACK_PREFIX):].split(':'))
+    if not (0 <= point_index < len(POINT_NAMES) and 0 <= value < 22):
+        raise ValueError(f"Неизвестные данные кнопки: {data}")
+    return description_slot(point_index, value), page
+
+
+def render_description_message(key: str, description_text: str) -> str:
+    """Полный текст сообщения с описанием в MarkdownV2, без ограничения длины."""
+    formatted_value = description_text.replace('**', '*').replace('\n\n', '\n')
+    return f"*{escape_markdown(key)}*\n\n{escape_markdown(formatted_value)}"
+
+
+def split_markdown_v2(text: str, limit: int = MAX_MESSAGE_LENGTH - PAGE_HEADER_RESERVE) -> list:
+    """
+    Делит готовый текст MarkdownV2 на страницы не длиннее limit. Режет только там,
+    где нет открытых сущностей и разорванных пар "\\x": по возможности по абзацу,
+    иначе по концу предложения, иначе по пробелу. Возвращает [(начало, конец), ...].
+    """
+    pages = []
+    start = 0
+    while len(text) - start > limit:
+        end = _safe_cut(text, start, start + limit)
+        pages.append((start, end))
+        start = end
+        while start < len(text) and text[start] in ' \n':
+            start += 1
+    pages.append((start, len(text)))
+    return pages
+
+
+def _safe_cut(text: str, start: int, hard_end: int) -> int:
+    # Лучшие места разреза каждого вида: перед позицией i, где все сущности закрыты
+    newline = sentence = space = None
+    open_entities = []
+    i = start
+    while i < hard_end:
+        char = text[i]
+        if char == '\\':
+            # Экранированная пара неделима; после "\\." - конец предложения
+            if i + 2 <= hard_end and not open_entities and text[i + 1] in '.!?' and text[i + 2:i + 3] == ' ':
+                sentence = i + 2
+            i += 2
+            continue
+        if char in _ENTITY_CHARS:
+            if open_entities and open_entities[-1] == char:
+                open_entities.pop()
+            else:
+                open_entities.append(char)
+        elif not open_entities:
+            if char == '\n':
+                newline = i
+            elif char == ' ':
+                space = i
+        i += 1
+
+    # Слишком короткая первая страница хуже разреза посреди абзаца
+    min_end = start + (hard_end - start) // 2
+    for cut in (newline, sentence, space):
+        if cut is not None and cut > min_end:
+            return cut
+    for cut in (newline, sentence, space):
+        if cut is not None and cut > start:
+            return cut
+    # Сущность длиннее страницы: режем по лимиту, не разрывая пару "\\x"
+    chunk = text[start:hard_end]
+    return hard_end - (len(chunk) - len(chunk.rstrip('\\'))) % 2
+
+
+def validate_markdown_v2(text: str) -> list:
+    """
+    Проверяет текст на ошибки, из-за которых Telegram отклонит сообщение:
+    неэкранированные спецсимволы, незакрытые сущности и превышение длины.
+    Возвращает список описаний проблем, пустой - если текст корректен.
+    """
+    problems = []
+    if len(text) > MAX_MESSAGE_LENGTH:
+        problems.append(f"длина {len(text)} больше {MAX_MESSAGE_LENGTH}")
+
+    open_entities = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            if i + 1 >= len(text):
+                problems.append("обратная косая черта в конце текста")
+            i += 2
+            continue
+        if open_entities and open_entities[-1] == '`':
+            # Внутри кода экранируются только ` и \, остальное - обычный текст
+            if char == '`':
+                open_entities.pop()
+            i += 1
+            continue
+        if char in _ENTITY_CHARS:
+            if open_entities and open_entities[-1] == char:
+                open_entities.pop()
+            else:
+                open_entities.append(char)
+        elif char in ESCAPE_CHARS:
+            problems.append(f"неэкранированный символ {char!r} в позиции {i}")
+        i += 1
+
+    if open_entities:
+        problems.append(f"незакрытые сущности: {''.join(open_entities)}")
+    return problems
+
+
+def _render_slot(slot: int) -> tuple:
+    key = _DESCRIPTION_KEYS[slot]
+    message_text = render_description_message(key, full_point_description(key))
+    return message_text, split_markdown_v2(message_text)
+
+
+def _page_text(key: str, message_text: str, pages: list, page: int) -> str:
+    start, end = pages[page]
+    if page == 0:
+        return message_text[start:end]
+    # Следующие страницы начинаются с заголовка, чтобы было видно, чьё это описание
+    return f"*{escape_markdown(key)}* \\({page + 1}/{len(pages)}\\)\n\n{message_text[start:end]}"
+
+
+def prerender_all() -> dict:
+    """Рендерит и делит на страницы сообщения для всех ключей. Возвращает {ключ: проблемы} для некорректных."""
+    invalid = {}
+    for slot, key in enumerate(_DESCRIPTION_KEYS):
+        message_text, pages = _rendered[slot] = _render_slot(slot)
+        problems = []
+        for page in range(len(pages)):
+            problems.extend(validate_markdown_v2(_page_text(key, message_text, pages, page)))
+        if problems:
+            invalid[key] = problems
+            logger.warning(f"Сообщение для '{key}' не прошло проверку MarkdownV2: {problems}")
+    return invalid
+
+
+def is_prerendered(slot: int) -> bool:
+    """Есть ли уже готовое сообщение для слота."""
+    return _rendered[slot] is not None
+
+
+def description_page(slot: int, page: int = 0) -> tuple:
+    """
+    (текст страницы, число страниц) описания слота. Смещения страниц считаются
+    один раз и кешируются; если предрендер не запускался, слот рендерится на месте.
+    IndexError, если такой страницы нет.
+    """
+    rendered = _rendered[slot]
+    if rendered is None:
+        rendered = _rendered[slot] = _render_slot(slot)
+    message_text, pages = rendered
+    if not 0 <= page < len(pages):
+        raise IndexError(f"Нет страницы {page} у описания {_DESCRIPTION_KEYS[slot]}")
+    return _page_text(_DESCRIPTION_KEYS[slot], message_text, pages, page), len(pages)
+
+
+def render_not_found(key: str) -> str:
+    """Сообщение для ключа, которого нет среди описаний пользователя."""
+    return render_description_message(key, DESCRIPTION_NOT_FOUND)
+
+
+if __name__ == "__main__":
+    invalid = prerender_all()
+    if invalid:
+        for key, problems in invalid.items():
+            print(f"{key}: {'; '.join(problems)}")
+        sys.exit(1)
+    paged = sum(len(pages) > 1 for _, pages in _rendered)
+    print(f"Все {len(_rendered)} сообщений прошли проверку MarkdownV2, на несколько страниц делятся {paged}.")
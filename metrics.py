@@ -0,0 +1,236 @@
+# Метрики бота: гистограммы задержек по этапам, счётчики попаданий в кеши и ошибок.
+# Отдаются в текстовом формате Prometheus на локальном HTTP-порту (PGD_METRICS_PORT).
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм в секундах: от 50 мкс (расчёты) до 10 с (Bot API)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = 'pgd_stage_seconds'
+API_METRIC = 'pgd_telegram_api_seconds'
+HANDLER_METRIC = 'pgd_handler_seconds'
+CACHE_METRIC = 'pgd_cache_requests_total'
+ERROR_METRIC = 'pgd_errors_total'
+
+_HELP = {
+    STAGE_METRIC: "Время этапов обработки (разбор даты, расчёт чашки, описания, экранирование)",
+    API_METRIC: "Время вызовов Telegram Bot API",
+    HANDLER_METRIC: "Время обработчиков диалога целиком",
+    CACHE_METRIC: "Обращения к кешам по результату hit/miss",
+    ERROR_METRIC: "Ошибки по обработчикам и видам",
+}
+
+# Обработчик диалога, в котором сейчас выполняется код: им помечаются вызовы Bot API
+current_handler = contextvars.ContextVar('current_handler', default='none')
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Registry:
+    """Гистограммы и счётчики с метками. Запись - O(log корзин) под одной блокировкой."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, metric: str, seconds: float, **labels) -> None:
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def inc(self, metric: str, amount: float = 1, **labels) -> None:
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, metric: str, func, help_text: str = '') -> None:
+        """Значение, которое читается функцией в момент выгрузки (например, длина очереди)."""
+        self._gauges[metric] = (func, help_text, 'gauge')
+
+    def counter_func(self, metric: str, func, help_text: str = '') -> None:
+        """Как gauge, но для растущего счётчика, который ведёт сам объект (имя с суффиксом _total)."""
+        self._gauges[metric] = (func, help_text, 'counter')
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4."""
+        with self._lock:
+            histograms = [(key, list(h.counts), h.total, h.count) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        seen = set()
+
+        def header(metric: str, kind: str, help_text: str) -> None:
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (metric, labels), counts, total, count in sorted(histograms):
+            header(metric, 'histogram', _HELP.get(metric, metric))
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_labels(labels, le=repr(bound))} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total!r}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+        for (metric, labels), value in sorted(counters):
+            header(metric, 'counter', _HELP.get(metric, metric))
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+        for metric, (func, help_text, kind) in sorted(self._gauges.items()):
+            try:
+                value = func()
+            except Exception:
+                logger.exception(f"Не удалось прочитать метрику {metric}")
+                continue
+            header(metric, kind, help_text or metric)
+            lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(labels: tuple, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in items) + '}'
+
+
+registry = Registry()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    registry.observe(STAGE_METRIC, seconds, stage=stage, handler=current_handler.get())
+
+
+def cache_access(cache: str, hit: bool) -> None:
+    registry.inc(CACHE_METRIC, cache=cache, result='hit' if hit else 'miss')
+
+
+def count_error(kind: str) -> None:
+    registry.inc(ERROR_METRIC, handler=current_handler.get(), kind=kind)
+
+
+@contextmanager
+def timed(stage: str):
+    """Замер этапа: with timed('date_parse'): ..."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def instrumented(func):
+    """Декоратор обработчика: общее время, необработанные ошибки и метка для вызовов Bot API."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_handler.set(name)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            count_error(type(e).__name__)
+            raise
+        finally:
+            registry.observe(HANDLER_METRIC, time.perf_counter() - started, handler=name)
+            current_handler.reset(token)
+
+    return wrapper
+
+
+def register_lru_cache(name: str, cached_func) -> None:
+    """Попадания и промахи functools.lru_cache (или объекта с таким же cache_info()), читаются при выгрузке."""
+    registry.counter_func(f'pgd_lru_{name}_hits_total', lambda: cached_func.cache_info().hits,
+                          f"Попадания в кеш {name}")
+    registry.counter_func(f'pgd_lru_{name}_misses_total', lambda: cached_func.cache_info().misses,
+                          f"Промахи кеша {name}")
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest, замеряющий каждый вызов Bot API с меткой метода и обработчика."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        handler = current_handler.get()
+        started = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        except Exception as e:
+            registry.inc(ERROR_METRIC, handler=handler, kind=f'api:{type(e).__name__}')
+            raise
+        finally:
+            registry.observe(API_METRIC, time.perf_counter() - started, method=api_method, handler=handler)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """HTTP-сервер /metrics в фоновом потоке."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='pgd-metrics', daemon=True)
+    thread.start()
+    logger.info(f"Метрики доступны на http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def metrics_server_from_env():
+    """Запускает сервер, если задан PGD_METRICS_PORT (адрес - PGD_METRICS_HOST, по умолчанию 127.0.0.1)."""
+    port = os.getenv('PGD_METRICS_PORT')
+    if not port:
+        return None
+    return start_metrics_server(int(port), os.getenv('PGD_METRICS_HOST', '127.0.0.1'))
@@ -0,0 +1,209 @@
+# Исходящая очередь к Bot API: общие и по-чатовые лимиты, повтор после 429 и склейка правок
+#
+# Подключается как rate limiter приложения (Application.builder().rate_limiter(...)),
+# поэтому через неё проходят все вызовы бота без изменений в обработчиках.
+# Вместо ошибок flood control при всплеске сообщения ждут своей очереди.
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Методы, на которые действуют лимиты Telegram на сообщения. Остальные
+# (answerCallbackQuery, getUpdates, setWebhook и т.п.) идут без ожидания.
+LIMITED_PREFIXES = ('send', 'edit', 'copy', 'forward')
+# Новые сообщения в чате: только они расходуют лимит чата, правки идут по общему лимиту
+CHAT_LIMITED_PREFIXES = ('send', 'copy', 'forward')
+# Правки, более новая из которых делает старую ненужной
+COALESCED_ENDPOINTS = ('editMessageText', 'editMessageReplyMarkup')
+GROUP_BURST = 3.0
+
+
+class TokenBucket:
+    """
+    Корзина маркеров с резервированием: acquire возвращает, сколько секунд ждать,
+    и сразу занимает маркер. Порядок вызовов сохраняется.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def acquire(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self, now: float) -> bool:
+        """Полностью восстановилась: можно удалить без потери точности."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class _PendingEdit:
+    """
+    Правка сообщения, ждущая очереди; более новая правка того же сообщения подменяет вызов.
+    Отправляет её отдельная задача, поэтому отмена одного из ждущих не отменяет остальных.
+    """
+
+    __slots__ = ('call', 'task', 'waiters')
+
+    def __init__(self, call: tuple):
+        self.call = call
+        self.task = None
+        self.waiters = 0
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """
+    Лимиты по умолчанию - из FAQ Telegram: около 30 сообщений в секунду на бота,
+    1 в секунду в личный чат с допустимыми короткими всплесками, 20 в минуту в группу.
+    Запаса на всплеск в личном чате хватает на весь диалог /start или /pair, так что
+    один пользователь не ждёт никогда. RetryAfter приостанавливает все отправки
+    на указанное время, затем запрос повторяется.
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 10.0,
+                 group_rate: float = 20 / 60, max_retries: int = 3):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self._edits = {}
+        self._paused_until = 0.0
+        self._purge_counter = itertools.count()
+        self.queue_depth = 0
+        self.sent = self.coalesced = self.retries = self.delayed = 0
+
+    @classmethod
+    def from_env(cls) -> "OutboundScheduler":
+        """PGD_OUTBOUND_GLOBAL_RATE, PGD_OUTBOUND_CHAT_RATE, PGD_OUTBOUND_CHAT_BURST,
+        PGD_OUTBOUND_GROUP_RATE (в секунду), PGD_OUTBOUND_MAX_RETRIES."""
+        return cls(
+            global_rate=float(os.getenv('PGD_OUTBOUND_GLOBAL_RATE', '30')),
+            chat_rate=float(os.getenv('PGD_OUTBOUND_CHAT_RATE', '1')),
+            chat_burst=float(os.getenv('PGD_OUTBOUND_CHAT_BURST', '10')),
+            group_rate=float(os.getenv('PGD_OUTBOUND_GROUP_RATE', str(20 / 60))),
+            max_retries=int(os.getenv('PGD_OUTBOUND_MAX_RETRIES', '3')),
+        )
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if not endpoint.startswith(LIMITED_PREFIXES):
+            return await callback(*args, **kwargs)
+
+        chat_id = data.get('chat_id')
+        # Правки не создают новых сообщений и ждут только общего лимита
+        chat_limited = chat_id if endpoint.startswith(CHAT_LIMITED_PREFIXES) else None
+        call = (callback, args, kwargs, rate_limit_args)
+        if endpoint in COALESCED_ENDPOINTS and chat_id is not None and data.get('message_id') is not None:
+            return await self._coalesced_edit((endpoint, chat_id, data['message_id']), call, chat_id)
+
+        self.queue_depth += 1
+        try:
+            await self._wait_turn(chat_limited)
+        finally:
+            self.queue_depth -= 1
+        return await self._send(callback, args, kwargs, chat_id, rate_limit_args)
+
+    async def _coalesced_edit(self, key: tuple, call: tuple, chat_id):
+        # Пока правка ждёт очереди, пришла более новая правка того же сообщения тем же методом:
+        # в её очередь уйдёт только последний вызов, а все ожидавшие получат один результат
+        pending = self._edits.get(key)
+        if pending is None:
+            pending = self._edits[key] = _PendingEdit(call)
+            pending.task = asyncio.create_task(self._send_edit(key, pending, chat_id))
+        else:
+            pending.call = call
+            self.coalesced += 1
+
+        pending.waiters += 1
+        try:
+            return await asyncio.shield(pending.task)
+        finally:
+            pending.waiters -= 1
+            # Правку отменяем, только если её результата больше никто не ждёт
+            if not pending.waiters and not pending.task.done():
+                pending.task.cancel()
+                self._forget_edit(key, pending)
+
+    async def _send_edit(self, key: tuple, pending: _PendingEdit, chat_id):
+        self.queue_depth += 1
+        try:
+            await self._wait_turn(None)
+        finally:
+            self.queue_depth -= 1
+            # Правки, пришедшие после этого момента, встают в очередь заново
+            self._forget_edit(key, pending)
+        callback, args, kwargs, rate_limit_args = pending.call
+        return await self._send(callback, args, kwargs, chat_id, rate_limit_args)
+
+    def _forget_edit(self, key: tuple, pending: _PendingEdit) -> None:
+        if self._edits.get(key) is pending:
+            del self._edits[key]
+
+    async def _wait_turn(self, chat_id) -> None:
+        # Маркеры занимаются в момент вызова: часы корзин никогда не уходят в будущее,
+        # а запрос ждёт, пока до него дойдёт очередь и в чате, и у бота
+        now = time.monotonic()
+        delay = self._global.acquire(now)
+        if chat_id is not None:
+            delay = max(delay, self._chat_bucket(chat_id).acquire(now))
+        delay = max(delay, self._paused_until - now)
+        if delay > 0:
+            self.delayed += 1
+            await asyncio.sleep(delay)
+        # Пауза после 429 могла начаться, пока мы ждали
+        while self._paused_until > time.monotonic():
+            await asyncio.sleep(self._paused_until - time.monotonic())
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if next(self._purge_counter) % 1000 == 999:
+                self._purge_idle_chats()
+            # Группы и каналы (отрицательный id или @username) ограничены строже личных чатов
+            group = isinstance(chat_id, str) or chat_id < 0
+            bucket = self._chats[chat_id] = (TokenBucket(self.group_rate, GROUP_BURST) if group
+                                             else TokenBucket(self.chat_rate, self.chat_burst))
+        return bucket
+
+    def _purge_idle_chats(self) -> None:
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.idle(now)]:
+            del self._chats[chat_id]
+
+    async def _send(self, callback, args, kwargs, chat_id, rate_limit_args):
+        max_retries = rate_limit_args if rate_limit_args is not None else self.max_retries
+        for attempt in itertools.count():
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                if attempt >= max_retries:
+                    logger.error(f"Лимит Telegram: запрос в чат {chat_id} не прошёл после {attempt} повторов")
+                    raise
+                self.retries += 1
+                pause = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                self._paused_until = max(self._paused_until, time.monotonic() + pause + 0.1)
+                logger.warning(f"Лимит Telegram, пауза {pause} с (чат {chat_id})")
+                # Место в очереди чата запрос уже занял, повтор ждёт паузы и общего лимита
+                await self._wait_turn(None)
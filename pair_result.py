@@ -0,0 +1,105 @@
+# Совместная диагностика пары для команды /pair
+#
+# Результат PGD_Pair зависит не от имён и не от самих дат, а только от дня, месяца
+# и суммы цифр года каждого партнёра. main_pair, tasks и periods_pair при этом
+# симметричны: от перестановки партнёров меняется лишь порядок задач в tasks_business.
+# Поэтому результат кешируется один раз под ключом из двух упорядоченных подписей,
+# и пара, которую спрашивают "с обеих сторон", считается один раз.
+import os
+import threading
+from collections import OrderedDict
+
+from cache_info import CacheInfo
+from markdown_escape import escape_markdown
+from pgd_bot import PairResult
+
+TASK_FIRST = "Задача первого"
+TASK_SECOND = "Задача второго"
+
+
+def pair_signature(date_str: str) -> str:
+    """Подпись партнёра для расчёта пары: день, месяц и сумма цифр года."""
+    day, month, year = map(int, date_str.split('.'))
+    return f"{day}.{month}.{sum(int(d) for d in str(year))}"
+
+
+def pair_key(date_1: str, date_2: str) -> tuple:
+    """(ключ кеша, переставлены ли партнёры). Ключ не зависит от порядка партнёров."""
+    signature_1, signature_2 = pair_signature(date_1), pair_signature(date_2)
+    if signature_1 <= signature_2:
+        return (signature_1, signature_2), False
+    return (signature_2, signature_1), True
+
+
+def compute_pair_result(date_1: str, date_2: str) -> dict:
+    """
+    Все четыре раздела совместной диагностики за один расчёт PairResult. Функция
+    модульного уровня с простыми типами в результате, поэтому годится и для пула процессов.
+    """
+    pair = PairResult.from_dates(date_1, date_2)
+    return {
+        'main_pair': pair.main_pair(),
+        'tasks': pair.tasks_dict(),
+        'periods': pair.periods_dict(),
+        'tasks_business': pair.tasks_business(),
+    }
+
+
+def swap_partners(result: dict) -> dict:
+    """Тот же результат для партнёров в обратном порядке."""
+    tasks_business = dict(result['tasks_business'])
+    tasks_business[TASK_FIRST], tasks_business[TASK_SECOND] = tasks_business[TASK_SECOND], tasks_business[TASK_FIRST]
+    return {**result, 'tasks_business': tasks_business}
+
+
+class PairResultCache:
+    """LRU результатов пар по ключу pair_key."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+
+    def put(self, key: tuple, result: dict) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.max_entries, len(self._results))
+
+
+pair_results = PairResultCache(int(os.getenv('PGD_PAIR_CACHE', '10000')))
+
+
+def build_pair_text(name_1: str, date_1: str, name_2: str, date_2: str, result: dict) -> str:
+    """Результаты пары в MarkdownV2. Текст может быть длиннее лимита Telegram, см. split_markdown_v2."""
+    text = (f"*Совместная диагностика: {escape_markdown(name_1)} \\({escape_markdown(date_1)}\\) "
+            f"и {escape_markdown(name_2)} \\({escape_markdown(date_2)}\\)*\n")
+
+    sections = list(result['main_pair'].items()) + list(result['tasks'].items())
+    if result['periods'] is not None:
+        sections += list(result['periods'].items())
+    for title, values in sections:
+        text += f"\n*{escape_markdown(title)}:*\n"
+        for key, value in values.items():
+            text += f"_{escape_markdown(key.strip())}_ `{value if value is not None else '-'}`\n"
+
+    text += "\n*Задачи партнёров:*\n"
+    labels = {TASK_FIRST: name_1, TASK_SECOND: name_2}
+    for key, value in result['tasks_business'].items():
+        text += f"_{escape_markdown(labels.get(key, key))}_ `{value if value is not None else '-'}`\n"
+    return text
@@ -0,0 +1,164 @@
+# Пакетный расчёт чашек для выгрузок клиентов (CSV или JSONL)
+#
+# Пример:
+#     python pgd_batch.py clients.csv charts.jsonl --workers 8
+#     python pgd_batch.py clients.jsonl charts.csv
+#
+# На входе строки с полями name, date (ДД.ММ.ГГГГ) и sex (Ж/М). Файл читается
+# потоково, в работе одновременно не больше 2 * workers пачек, поэтому память
+# не зависит от размера входа.
+import argparse
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cashka_preprocessor import PersonalityProcessor, warm_cache
+from pgd_bot import PGD_Person_Mod, person_periods, person_tasks
+from pgd_points import ANCESTRAL_NAMES, CROSSROAD_NAMES, POINT_NAMES, DateFormatError
+
+TASK_NAMES = ('КР', 'ЛКО', 'БН')
+PERIOD_NAMES = ("1-й период", "2-й период", "3-й период", "4-й период")
+CSV_COLUMNS = ('name', 'date', 'sex', *POINT_NAMES, *ANCESTRAL_NAMES, *CROSSROAD_NAMES,
+               *TASK_NAMES, *PERIOD_NAMES, 'error')
+
+
+class _BadLine(str):
+    """Строка JSONL, которую не удалось разобрать; текст - описание ошибки."""
+
+
+def read_rows(path: str):
+    """Построчно читает CSV (с заголовком) или JSONL; '-' означает stdin."""
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+    try:
+        if path.endswith('.jsonl') or path.endswith('.json'):
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        # chart_record превратит это в строку с ошибкой, пачка не прерывается
+                        yield _BadLine(f"строка {line_number}: некорректный JSON: {e}")
+        else:
+            yield from csv.DictReader(f)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def chart_record(row: dict, with_descriptions: bool) -> dict:
+    """Полный расчёт одной строки: чашка, задачи, периоды и при необходимости описания."""
+    if isinstance(row, _BadLine):
+        return {'name': '', 'date': '', 'sex': '', 'error': str(row)}
+    if not isinstance(row, dict):
+        return {'name': '', 'date': '', 'sex': '', 'error': f"ожидался объект с полями name, date, sex: {row!r}"}
+    # Короткая строка CSV даёт None в недостающих полях, JSONL - null или число
+    name, date, sex = (str(row.get(key) or '') for key in ('name', 'date', 'sex'))
+    record = {'name': name, 'date': date, 'sex': sex}
+    try:
+        chart = PGD_Person_Mod(name, date, sex).chart
+    except (DateFormatError, ValueError) as e:
+        record['error'] = str(e)
+        return record
+
+    record['points'] = chart.point_values()
+    record['ancestral'] = dict(zip(ANCESTRAL_NAMES, chart.ancestral))
+    record['crossroad'] = dict(zip(CROSSROAD_NAMES, chart.crossroad))
+    record['tasks'] = dict(zip(TASK_NAMES, person_tasks(chart).values()))
+    periods = person_periods(chart)
+    record['periods'] = periods["Бизнес периоды"] if periods else dict.fromkeys(PERIOD_NAMES)
+    if with_descriptions:
+        record['descriptions'] = PersonalityProcessor.from_chart(chart).get_full_description()
+    return record
+
+
+_SECTION_SIZES = {'points': len(POINT_NAMES), 'ancestral': len(ANCESTRAL_NAMES), 'crossroad': len(CROSSROAD_NAMES),
+                  'tasks': len(TASK_NAMES), 'periods': len(PERIOD_NAMES)}
+
+
+def _csv_values(record: dict) -> list:
+    values = [record['name'], record['date'], record['sex']]
+    for section, size in _SECTION_SIZES.items():
+        section_values = record.get(section)
+        values.extend(section_values.values() if section_values else [None] * size)
+    values.append(record.get('error', ''))
+    return ['' if v is None else v for v in values]
+
+
+def process_chunk(rows: list, output_format: str, with_descriptions: bool) -> str:
+    """Считает пачку строк и сразу сериализует её, чтобы основной процесс только писал."""
+    buffer = io.StringIO()
+    if output_format == 'csv':
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(_csv_values(chart_record(row, with_descriptions)))
+    else:
+        for row in rows:
+            buffer.write(json.dumps(chart_record(row, with_descriptions), ensure_ascii=False))
+            buffer.write('\n')
+    return buffer.getvalue()
+
+
+def chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(input_path: str, output_path: str, output_format: str, workers: int,
+              chunk_size: int, with_descriptions: bool) -> tuple:
+    """Возвращает (число строк, секунды)."""
+    started = time.perf_counter()
+    total = 0
+    out = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8', newline='')
+    try:
+        if output_format == 'csv':
+            csv.writer(out).writerow(CSV_COLUMNS)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=warm_cache if with_descriptions else None) as pool:
+            pending = deque()
+            for chunk in chunked(read_rows(input_path), chunk_size):
+                pending.append((len(chunk), pool.submit(process_chunk, chunk, output_format, with_descriptions)))
+                # Ограничиваем число пачек в работе, порядок строк сохраняется
+                while len(pending) >= 2 * workers:
+                    size, future = pending.popleft()
+                    out.write(future.result())
+                    total += size
+            for size, future in pending:
+                out.write(future.result())
+                total += size
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return total, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пакетный расчёт чашек PGD")
+    parser.add_argument('input', help="CSV с заголовком name,date,sex или JSONL; '-' для stdin")
+    parser.add_argument('output', help="файл результата (.csv или .jsonl); '-' для stdout")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="по умолчанию по расширению output")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--descriptions', action='store_true', help="добавить полные описания (только JSONL)")
+    args = parser.parse_args()
+
+    output_format = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    if args.descriptions and output_format == 'csv':
+        parser.error("описания поддерживаются только в JSONL")
+
+    total, seconds = run_batch(args.input, args.output, output_format, args.workers,
+                               args.chunk_size, args.descriptions)
+    print(f"Обработано строк: {total} за {seconds:.2f} с ({total / seconds if seconds else 0:.0f} строк/с)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# Обратный индекс: какие даты рождения дают заданные значения точек
+#
+# Пример:
+#     python pgd_index.py "Точка Ж = 5" "Точка Й = 12" --sex Ж --from 1950 --to 2030
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+from pgd_points import ANCESTRAL_NAMES, CROSSROAD_NAMES, POINT_NAMES, SEXES, lookup_row
+
+COLUMNS = POINT_NAMES + ANCESTRAL_NAMES + CROSSROAD_NAMES
+_COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+
+
+class DateSet:
+    """Множество дат диапазона индекса в виде битовой маски: бит i - день start + i."""
+
+    def __init__(self, start: date, bits: int):
+        self.start = start
+        self.bits = bits
+
+    def __and__(self, other: "DateSet") -> "DateSet":
+        return DateSet(self.start, self.bits & other.bits)
+
+    def __or__(self, other: "DateSet") -> "DateSet":
+        return DateSet(self.start, self.bits | other.bits)
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def offsets(self):
+        """Номера дней от начала диапазона по возрастанию."""
+        data = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                yield byte_index * 8 + low.bit_length() - 1
+                byte ^= low
+
+    def __iter__(self):
+        for offset in self.offsets():
+            yield self.start + timedelta(days=offset)
+
+
+class DateIndex:
+    """
+    Индекс (точка, значение) -> множество дат для диапазона лет и каждого пола.
+
+    Строится по тем же формулам, что и PGD_Person_Mod (через lookup_row).
+    Запрос с несколькими условиями - пересечение битовых масок.
+    """
+
+    def __init__(self, first_year: int = 1950, last_year: int = 2030):
+        self.start = date(first_year, 1, 1)
+        self.end = date(last_year, 12, 31)
+        self.days = (self.end - self.start).days + 1
+        self._bitmaps = {sex: self._build(sex) for sex in SEXES}
+        self._all = DateSet(self.start, (1 << self.days) - 1)
+
+    def _build(self, sex: str) -> list:
+        # Сначала смещения дней по каждому (колонка, значение), затем по одной маске на список
+        offsets = [[[] for _ in range(23)] for _ in COLUMNS]
+        current = self.start
+        for offset in range(self.days):
+            values = lookup_row(current.day, current.month, current.year, sex)
+            for column, value in enumerate(values):
+                if value >= 0:
+                    offsets[column][value].append(offset)
+            current += timedelta(days=1)
+
+        bitmaps = []
+        for column_offsets in offsets:
+            column_bitmaps = []
+            for value_offsets in column_offsets:
+                mask = bytearray((self.days + 7) // 8)
+                for offset in value_offsets:
+                    mask[offset >> 3] |= 1 << (offset & 7)
+                column_bitmaps.append(int.from_bytes(mask, 'little'))
+            bitmaps.append(column_bitmaps)
+        return bitmaps
+
+    def dates_with(self, point: str, value: int, sex: str) -> DateSet:
+        """Даты, в которые у человека данного пола точка point равна value."""
+        column_bitmaps = self._bitmaps[sex][_COLUMN_INDEX[point]]
+        return DateSet(self.start, column_bitmaps[value] if 0 <= value < len(column_bitmaps) else 0)
+
+    def query(self, constraints: dict, sex: str) -> DateSet:
+        """Даты, удовлетворяющие всем условиям {точка: значение}."""
+        result = self._all
+        for point, value in constraints.items():
+            result = result & self.dates_with(point, value, sex)
+            if not result:
+                break
+        return result
+
+
+def parse_constraint(text: str) -> tuple:
+    """'Точка Ж = 5' -> ('Точка Ж', 5)."""
+    point, value = (part.strip() for part in text.split('='))
+    if point not in _COLUMN_INDEX:
+        raise ValueError(f"Неизвестная точка: {point}")
+    return point, int(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Поиск дат рождения по значениям точек")
+    parser.add_argument('constraints', nargs='+', help="условия вида 'Точка Ж = 5'")
+    parser.add_argument('--sex', choices=SEXES, default=SEXES[0])
+    parser.add_argument('--from', dest='first_year', type=int, default=1950)
+    parser.add_argument('--to', dest='last_year', type=int, default=2030)
+    parser.add_argument('--limit', type=int, default=20, help="сколько дат напечатать")
+    args = parser.parse_args()
+
+    constraints = dict(parse_constraint(text) for text in args.constraints)
+
+    started = time.perf_counter()
+    index = DateIndex(args.first_year, args.last_year)
+    built = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = index.query(constraints, args.sex)
+    count = len(result)
+    queried = time.perf_counter() - started
+
+    print(f"Индекс на {index.days} дней построен за {built:.2f} с, запрос: {queried * 1e6:.0f} мкс")
+    print(f"Найдено дат: {count}")
+    for i, found in enumerate(result):
+        if i >= args.limit:
+            print("...")
+            break
+        print(found.strftime('%d.%m.%Y'))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
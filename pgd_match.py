@@ -0,0 +1,189 @@
+# Поиск k лучших партнёров для человека по сохранённой популяции чашек (требует numpy)
+import sys
+import time
+
+import numpy as np
+
+from pgd_points import parse_date
+from pgd_vector import PAIR_TASK_NAMES, pair_block, pair_table, year_digit_sums
+
+# Чашка, задачи и периоды пары зависят только от класса партнёра:
+# (день % 22, месяц % 22, сумма цифр года % 22) - при фиксированном первом партнёре
+CLASS_COUNT = 22 ** 3
+
+
+class Scorer:
+    """
+    Оценка пар: функция от словаря колонок пары (см. pgd_vector.PAIR_COLUMNS),
+    возвращающая массив чисел, больше - лучше.
+
+    table_only=True означает, что функция читает только колонки таблицы
+    сочетаний (чашка, задачи, периоды). Тогда оценка одинакова для всего класса
+    партнёров и поиск идёт по индексу классов, а не по всем людям.
+    """
+
+    def __init__(self, func, table_only: bool = True):
+        self.func = func
+        self.table_only = table_only
+
+    def __call__(self, block: dict) -> np.ndarray:
+        return np.asarray(self.func(block), dtype=np.float64)
+
+
+def _karmic_freedom(block: dict) -> np.ndarray:
+    return sum((block[name] < 0).astype(np.int8) for name in PAIR_TASK_NAMES)
+
+
+# Сколько из сверхзадач PGD_Pair.tasks (КР, ЛКО, БН) у пары не возникло: 0-3
+KARMIC_FREEDOM = Scorer(_karmic_freedom)
+
+
+def matching_points(targets: dict) -> Scorer:
+    """Число колонок пары, совпавших с желаемыми значениями, например {'Точка Ж': 5}."""
+    table_only = all(name in pair_table() for name in targets)
+
+    def score(block: dict) -> np.ndarray:
+        return sum((block[name] == value).astype(np.int8) for name, value in targets.items())
+
+    return Scorer(score, table_only=table_only)
+
+
+class Population:
+    """Предразобранные чашки популяции с индексом людей по классам партнёра."""
+
+    def __init__(self, ids: list, day, month, year):
+        self.ids = list(ids)
+        self.day = np.asarray(day, dtype=np.int16)
+        self.month = np.asarray(month, dtype=np.int16)
+        self.ysum = year_digit_sums(year).astype(np.int16)
+
+        class_id = ((self.day % 22).astype(np.int32) * 22 + self.month % 22) * 22 + self.ysum % 22
+        # Люди, отсортированные по классу, и границы классов в этом порядке (как в CSR)
+        self._order = np.argsort(class_id, kind='stable')
+        self._bounds = np.searchsorted(class_id[self._order], np.arange(CLASS_COUNT + 1))
+
+    @classmethod
+    def from_records(cls, records) -> "Population":
+        """Из пар (id, дата ДД.ММ.ГГГГ)."""
+        ids, days, months, years = [], [], [], []
+        for person_id, date in records:
+            day, month, year = parse_date(date)
+            ids.append(person_id)
+            days.append(day)
+            months.append(month)
+            years.append(year)
+        return cls(ids, days, months, years)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, ids=np.asarray(self.ids, dtype=object), day=self.day,
+                            month=self.month, ysum=self.ysum, order=self._order, bounds=self._bounds)
+
+    @classmethod
+    def load(cls, path: str) -> "Population":
+        data = np.load(path, allow_pickle=True)
+        population = cls.__new__(cls)
+        population.ids = list(data['ids'])
+        population.day, population.month, population.ysum = data['day'], data['month'], data['ysum']
+        population._order, population._bounds = data['order'], data['bounds']
+        return population
+
+
+def _ranked(indices: np.ndarray, scores: np.ndarray, k: int) -> list:
+    """k лучших по убыванию оценки, при равенстве - по порядку в популяции."""
+    order = np.lexsort((indices, -scores))[:k]
+    return list(zip(indices[order].tolist(), scores[order].tolist()))
+
+
+def _top_k_by_class(day: int, month: int, ysum: int, population: Population, k: int,
+                    scorer: Scorer, exclude) -> list:
+    # Оценка каждого из 22 ** 3 классов партнёра - один проход по таблице сочетаний
+    classes = np.arange(CLASS_COUNT)
+    c_day, rest = np.divmod(classes, 22 * 22)
+    c_month, c_ysum = np.divmod(rest, 22)
+    key = ((day + c_day) % 22 * 22 + (month + c_month) % 22) * 22 + (ysum + c_ysum) % 22
+    class_scores = scorer({name: column[key] for name, column in pair_table().items()})
+
+    sizes = np.diff(population._bounds)
+    class_scores = np.where(sizes > 0, class_scores, -np.inf)
+    by_score = np.argsort(-class_scores, kind='stable')
+
+    # Берём классы по убыванию оценки, пока не наберётся k человек, плюс все классы
+    # с той же оценкой, что и последний взятый, чтобы порядок при равенстве был честным
+    needed = k + (1 if exclude is not None else 0)
+    taken = np.cumsum(sizes[by_score])
+    last = min(int(np.searchsorted(taken, needed)), len(by_score) - 1)
+    chosen = by_score[class_scores[by_score] >= class_scores[by_score[last]]]
+    chosen = chosen[np.isfinite(class_scores[chosen])]
+
+    indices = np.concatenate([population._order[population._bounds[c]:population._bounds[c + 1]] for c in chosen]
+                             or [np.empty(0, dtype=np.int64)])
+    scores = np.repeat(class_scores[chosen], sizes[chosen])
+    if exclude is not None:
+        keep = indices != exclude
+        indices, scores = indices[keep], scores[keep]
+    return _ranked(indices, scores, k)
+
+
+def _top_k_scan(day: int, month: int, ysum: int, population: Population, k: int,
+                scorer: Scorer, exclude, block_size: int) -> list:
+    best_indices = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0)
+    for start in range(0, len(population), block_size):
+        stop = min(len(population), start + block_size)
+        block = pair_block(np.int16(day), np.int16(month), np.int16(ysum),
+                           population.day[start:stop], population.month[start:stop], population.ysum[start:stop])
+        scores = scorer(block)
+        indices = np.arange(start, stop)
+        if exclude is not None and start <= exclude < stop:
+            scores[exclude - start] = -np.inf
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            # Все, кто делит k-ю оценку, остаются кандидатами
+            keep = np.flatnonzero(scores >= scores[keep].min())
+            indices, scores = indices[keep], scores[keep]
+        ranked = _ranked(np.concatenate([best_indices, indices]), np.concatenate([best_scores, scores]), k)
+        best_indices = np.array([i for i, _ in ranked], dtype=np.int64)
+        best_scores = np.array([s for _, s in ranked])
+    return [(i, s) for i, s in zip(best_indices.tolist(), best_scores.tolist()) if np.isfinite(s)]
+
+
+def top_k_partners(date: str, population: Population, k: int = 10, scorer: Scorer = KARMIC_FREEDOM,
+                   exclude: int = None, block_size: int = 1_000_000) -> list:
+    """
+    k лучших партнёров для человека с датой рождения date.
+
+    Возвращает список (id, оценка, индекс в популяции) по убыванию оценки.
+    exclude - индекс самого человека в популяции, если он там есть.
+    """
+    day, month, year = parse_date(date)
+    ysum = int(year_digit_sums(year))
+    if scorer.table_only:
+        ranked = _top_k_by_class(day, month, ysum, population, k, scorer, exclude)
+    else:
+        ranked = _top_k_scan(day, month, ysum, population, k, scorer, exclude, block_size)
+    return [(population.ids[index], score, index) for index, score in ranked]
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    day = rng.integers(1, 29, size)
+    month = rng.integers(1, 13, size)
+    year = rng.integers(1940, 2010, size)
+
+    started = time.perf_counter()
+    population = Population(range(size), day, month, year)
+    print(f"Индекс популяции из {size} человек: {time.perf_counter() - started:.2f} с")
+
+    scorer = matching_points({'Точка Ж': 5, 'Точка Й': 12})
+    slow = Scorer(scorer.func, table_only=False)
+    for label, current in (("индекс классов", scorer), ("блочный проход", slow)):
+        started = time.perf_counter()
+        result = top_k_partners('09.10.1988', population, k=10, scorer=current)
+        print(f"{label}: {(time.perf_counter() - started) * 1000:.1f} мс, лучшие: {result[:3]}")
+
+    assert top_k_partners('09.10.1988', population, 50, scorer) == top_k_partners('09.10.1988', population, 50, slow)
+    print("Индекс классов и блочный проход совпадают.")
@@ -0,0 +1,368 @@
+# Арифметика чашки PGD_Person_Mod и предвычисленная таблица по всей области входных данных
+import sys
+from array import array
+from functools import lru_cache
+
+# Подписи позиций в том порядке, в котором их возвращает PGD_Person_Mod.calculate_points
+PERSON_CUP_LABELS = (
+    "Первый период 0-30 лет. Характерные уроки и этапы на этот возраст.",
+    "Второй период 30-60 лет. Характерные уроки и этапы на этот возраст.",
+    "После 60ти лет. Характерные уроки и этапы на этот возраст.",
+    "Точка входа: то с чем человек пришёл в этот мир. Некий опыт, уже имеющийся с предыдущих жизней. Важно вспомнить и пользоваться им.",
+    "Инь, женская сущность. Женское проявленное в социальной сфере, общении, отношениях. Фильтр на партнёршу для мужчин",
+    "Как проявляется профессионализм – для женской диагностики. Ожидания в совместной жизн, чего вы хотите от партнёрши или как Вы будете себя с ней вести – для мужской диагностики",
+    "Ян, мужская сущность, проявленная в социальной  сфере, общении, отношениях – для мужской диагностики. Внутренний мужчина или фильтры при выборе партнёра в женской диагностике.",
+    "Мужское проявленное в социальной сфере, общении, отношениях. Ожидания от партнёра или поведение с ним - для женской диагностики",
+    "Сущность.Способ действия.Самое сильное качество.",
+    "Намерение/мотивация ЗАЧЕМ (ты это делаешь)? Характер, данность, пока не станешь осознанным.",
+    "Уравновешивающее число. Дзен-сила. Выход. КУДА (реализуешь)?",
+    "Точка выхода. Урок, тот опыт, за которым ты пришёл в эту жизнь, чему нужно научиться во внешнем мире. Ключ к пониманию и представлению.",
+    "Внутренняя личность. Внутренний мир. Для женской диагностики",
+    "Соединение внутреннего и внешнего мира. Урок. Для женской диагностики",
+    "Внутренняя личность. Внутренний мир.Для мужской диагностики",
+    "Соединение внутреннего и внешнего мира. Урок. Для мужской диагностики",
+)
+
+PERSON_ANCESTRAL_LABELS = (
+    "Способ действия, доставшийся по наследству. Так действовали у тебя в роду предки.",
+    "Отношения с противоположным полом, доставшиеся по наследству, опыт предков.",
+    "К чему было важно прийти в отношениях предшествующим поколениям, их проявление себя, какие они были в этих отношениях и что у вас есть в генах.",
+    "Родовая уравновешивающая сила",
+)
+
+PERSON_CROSSROAD_LABELS = (
+    "Способ действия по индвидуальной карте личности, твои наработки, твоя манера поведения. ",
+    "Отношения с противоположным полом, которые ты строишь сам по индвидуальной карте личности, твои наработки, твоя манера поведения. ",
+    "К чему важно прийти в отношениях, проявление себя, какой я в этих отношениях.",
+    "Индивидуальная уравновешивающая сила.",
+)
+
+# Короткие имена точек основной чашки, под которыми они лежат в корпусе описаний
+POINT_NAMES = ('Точка А', 'Точка Б', 'Точка В', 'Точка Г', 'Точка Д', 'Точка Л', 'Точка Е', 'Точка К',
+               'Точка Ж', 'Точка З', 'Точка И', 'Точка Й', 'Точка М', 'Точка Н', 'Точка О', 'Точка П')
+
+# Короткие имена родовых данностей и перекрёстка для колонок выгрузок
+ANCESTRAL_NAMES = ('РСД', 'РОПП', 'РЦО', 'РУС')
+CROSSROAD_NAMES = ('ИСД', 'ИОПП', 'ИЦО', 'ИУС')
+
+SEXES = ('Ж', 'М')
+
+# Общая таблица подписей: номер точки (0-23) - её индекс в значениях чашки
+POINT_LABELS = PERSON_CUP_LABELS + PERSON_ANCESTRAL_LABELS + PERSON_CROSSROAD_LABELS
+POINT_COUNT = len(POINT_LABELS)
+
+# Значение точек М/Н у мужчин и О/П у женщин в array('b') (None в словаре calculate_points)
+MISSING_POINT = -1
+_OPTIONAL_POINTS = range(12, 16)
+
+
+class DateFormatError(ValueError):
+    """Дата не разбирается в формате ДД.ММ.ГГГГ."""
+
+
+def parse_date(date: str) -> tuple:
+    """Разбирает строку ДД.ММ.ГГГГ в кортеж (день, месяц, год)."""
+    try:
+        X1, X2, X3 = map(int, date.split('.'))
+    except Exception as e:
+        raise DateFormatError(str(e)) from e
+    return X1, X2, X3
+
+
+def year_digit_sum(year: int) -> int:
+    """Сумма цифр года, как её считает calculate_points."""
+    return sum([int(d) for d in str(year)])
+
+
+def person_points(day: int, month: int, sum_year: int, sex: str) -> tuple:
+    """
+    Живой расчёт чашки по модулю 22.
+
+    Возвращает кортеж из 24 значений: 16 точек основной чашки,
+    4 родовые данности и 4 значения перекрёстка в порядке подписей выше.
+    """
+    point_A = day % 22
+    point_B = month
+    point_V = sum_year % 22
+    point_G = (point_A + point_B + point_V) % 22
+    point_D = (point_A + point_B) % 22
+    point_L = (22 - point_D) % 22
+    point_E = (point_B + point_V) % 22
+    point_K = (22 - point_E) % 22
+    point_J = (point_D + point_E) % 22
+    point_Z = (abs(point_D - point_E) + point_J) % 22
+    point_I = (point_J + point_Z) % 22
+    point_Y = (point_A + point_V + point_Z) % 22
+
+    point_M = point_N = point_O = point_P = None
+
+    # Родовые данности
+    RSD = point_J
+    RUS = point_I
+
+    if sex == 'Ж':
+        point_M = (point_G + point_I + point_L) % 22
+        point_N = (point_M + point_Y) % 22
+        ROPP = (point_L + point_E) % 22
+        ISD = abs(RSD - point_N)
+        IOPP = abs(ROPP - point_N)
+        IUS = abs(RUS - point_N)
+    elif sex == 'М':
+        point_O = (point_G + point_I + point_K) % 22
+        point_P = (point_O + point_Y) % 22
+        ROPP = (point_D + point_K) % 22
+        ISD = abs(RSD - point_P)
+        IOPP = abs(ROPP - point_P)
+        IUS = abs(RUS - point_P)
+    else:
+        raise ValueError(f"Неизвестный пол: {sex}")
+
+    RCO = (RSD + ROPP) % 22
+    ICO = (ISD + IOPP) % 22
+
+    return (point_A, point_B, point_V, point_G, point_D, point_L, point_E, point_K,
+            point_J, point_Z, point_I, point_Y, point_M, point_N, point_O, point_P,
+            RSD, ROPP, RCO, RUS,
+            ISD, IOPP, ICO, IUS)
+
+
+def points_to_dict(values: tuple) -> dict:
+    """Раскладывает кортеж из person_points в привычный словарь calculate_points."""
+    # Один итератор на все три раздела: каждый zip забирает ровно столько значений, сколько у него подписей
+    values = iter(values)
+    return {"Основная чашка": dict(zip(PERSON_CUP_LABELS, values)),
+            "Родовые данности": dict(zip(PERSON_ANCESTRAL_LABELS, values)),
+            "Перекрёсток": dict(zip(PERSON_CROSSROAD_LABELS, values))}
+
+
+def pack_points(values: tuple) -> array:
+    """Кортеж из person_points в array('b'), None становится MISSING_POINT."""
+    return array('b', [MISSING_POINT if value is None else value for value in values])
+
+
+def unpack_points(points) -> tuple:
+    """Обратно к кортежу person_points: MISSING_POINT становится None."""
+    values = points.tolist()
+    # Отсутствовать могут только точки М, Н, О и П
+    for point_id in _OPTIONAL_POINTS:
+        if values[point_id] < 0:
+            values[point_id] = None
+    return tuple(values)
+
+
+# --- Повторы значений ---
+# Значения точек - небольшие целые числа (0..21, у пары точки Л и К бывают равны 22),
+# поэтому повторы считаются не через Counter и set, а битовыми масками: в маске
+# уровня k поднят бит v, если значение v встретилось не меньше k раз.
+
+# Полосы бизнес-периодов: значения 1-10, 11-20 и 0 или 21
+PERIOD_BANDS = (0b11111111110, 0b11111111110 << 10, 1 | 1 << 21)
+
+
+def repeat_masks(values, masks: tuple = (0, 0, 0)) -> tuple:
+    """
+    Маски значений, встретившихся 1+, 2+ и 3+ раз; отрицательные (MISSING_POINT) пропускаются.
+    masks - результат предыдущего вызова, чтобы досчитать повторы по объединению списков.
+    """
+    once, twice, thrice = masks
+    for value in values:
+        if value >= 0:
+            bit = 1 << value
+            thrice |= twice & bit
+            twice |= once & bit
+            once |= bit
+    return once, twice, thrice
+
+
+def mask_sum(mask: int):
+    """Сумма значений, биты которых подняты, по модулю 22; None для пустой маски."""
+    if not mask:
+        return None
+    total = 0
+    while mask:
+        low = mask & -mask
+        total += low.bit_length() - 1
+        mask ^= low
+    return total % 22
+
+
+def periods_from_mask(repeated: int):
+    """Бизнес-периоды (1-й, 2-й, 3-й, 4-й) по маске значений чашки с 2+ повторами; None без повторов."""
+    if not repeated:
+        return None
+    period_1, period_2, period_3 = (mask_sum(repeated & band) for band in PERIOD_BANDS)
+    present = [p for p in (period_1, period_2, period_3) if p is not None]
+    period_4 = sum(present) % 22 if present else None
+    return period_1, period_2, period_3, period_4
+
+
+class PersonChart:
+    """
+    Результат расчёта чашки одного человека.
+
+    Значения 24 точек - строка array('b') по номерам точек (индексам POINT_LABELS),
+    отсутствующие точки равны MISSING_POINT. Строка не копируется: чашка хранит
+    общую таблицу и смещение строки в ней (для дат вне таблицы - свой массив и 0).
+    Подписи тоже общие, словари с ними собираются только по запросу (as_dict, point_values).
+    Считается один раз (см. PGD_Person_Mod.chart) и передаётся дальше
+    в расчёт задач, периодов и описаний, которые принимают только готовую чашку.
+    """
+
+    __slots__ = ('name', 'date', 'sex', '_table', '_offset')
+
+    def __init__(self, name: str, date: str, sex: str, table: array, offset: int = 0):
+        self.name = name
+        self.date = date
+        self.sex = sex
+        self._table = table
+        self._offset = offset
+
+    @classmethod
+    def from_date(cls, name: str, date: str, sex: str) -> "PersonChart":
+        day, month, year = parse_date(date)
+        return cls(name, date, sex, *locate_row(day, month, year, sex))
+
+    def __repr__(self) -> str:
+        return f"PersonChart({self.name!r}, {self.date!r}, {self.sex!r}, {self.values!r})"
+
+    def value(self, point_id: int):
+        """Значение точки по номеру, None для отсутствующей."""
+        value = self._table[self._offset + point_id]
+        return None if value < 0 else value
+
+    @property
+    def points(self) -> array:
+        """Все 24 значения, отсутствующие - MISSING_POINT."""
+        return self._table[self._offset:self._offset + POINT_COUNT]
+
+    @property
+    def values(self) -> tuple:
+        """Кортеж из 24 значений в формате person_points (с None)."""
+        return unpack_points(self.points)
+
+    @property
+    def cup(self) -> array:
+        """16 точек основной чашки, отсутствующие - MISSING_POINT."""
+        return self._table[self._offset:self._offset + 16]
+
+    @property
+    def ancestral(self) -> array:
+        """Родовые данности."""
+        return self._table[self._offset + 16:self._offset + 20]
+
+    @property
+    def crossroad(self) -> array:
+        """Перекрёсток."""
+        return self._table[self._offset + 20:self._offset + 24]
+
+    def as_dict(self) -> dict:
+        """Словарь в формате calculate_points (для строк таблицы - копия из ограниченного кеша)."""
+        if self._table is not _TABLE:
+            return points_to_dict(self.values)
+        cup, ancestral, crossroad = _row_dicts(self._offset)
+        return {"Основная чашка": cup.copy(), "Родовые данности": ancestral.copy(), "Перекрёсток": crossroad.copy()}
+
+    def point_values(self) -> dict:
+        """Основная чашка с короткими ключами вида 'Точка А' для PersonalityProcessor."""
+        return dict(zip(POINT_NAMES, unpack_points(self.cup)))
+
+
+# --- Предвычисленная таблица ---
+# Результат зависит только от дня % 22, месяца (1-12), суммы цифр года % 22 и пола,
+# поэтому вся область помещается в 22 * 12 * 22 * 2 = 11616 строк. Строки лежат
+# подряд в одном array('b') по POINT_COUNT байт. Таблица строится при импорте
+# (десятки миллисекунд), а не на первом запросе.
+
+# Смещения строк заранее: чашки ссылаются на одни и те же объекты int, а не создают свои
+_ROW_OFFSETS = tuple(range(0, 22 * 12 * 22 * 2 * POINT_COUNT, POINT_COUNT))
+
+
+def _table_key(day_mod: int, month: int, year_mod: int, sex_index: int) -> int:
+    return ((day_mod * 12 + (month - 1)) * 22 + year_mod) * 2 + sex_index
+
+
+def build_table() -> array:
+    """Строит таблицу живым расчётом по всей области."""
+    table = array('b', bytes(22 * 12 * 22 * 2 * POINT_COUNT))
+    for day_mod in range(22):
+        for month in range(1, 13):
+            for year_mod in range(22):
+                for sex_index, sex in enumerate(SEXES):
+                    start = _table_key(day_mod, month, year_mod, sex_index) * POINT_COUNT
+                    table[start:start + POINT_COUNT] = pack_points(person_points(day_mod, month, year_mod, sex))
+    return table
+
+
+def _build_year_sums(count: int = 10000) -> bytes:
+    """Сумма цифр года % 22 для годов 0..count-1: сумма цифр y - это сумма цифр y // 10 плюс y % 10."""
+    sums = [0] * count
+    for year in range(1, count):
+        sums[year] = sums[year // 10] + year % 10
+    return bytes(value % 22 for value in sums)
+
+
+_TABLE = build_table()
+_YEAR_SUMS = _build_year_sums()
+
+
+# Словари calculate_points самых частых строк; кеш ограничен (около 1 МБ), иначе
+# за все 11616 строк он вырос бы до ~11 МБ при таблице в 0.3 МБ
+@lru_cache(maxsize=1024)
+def _row_dicts(offset: int) -> tuple:
+    return tuple(points_to_dict(unpack_points(_TABLE[offset:offset + POINT_COUNT])).values())
+
+
+def locate_row(day: int, month: int, year: int, sex: str) -> tuple:
+    """
+    (массив, смещение) строки значений точек для даты без копирования: общая таблица
+    для корректных дат и свой массив с живым расчётом для всего, что за её пределы выходит.
+    """
+    if 1 <= day <= 31 and 1 <= month <= 12 and 0 <= year < len(_YEAR_SUMS) and sex in SEXES:
+        return _TABLE, _ROW_OFFSETS[_table_key(day % 22, month, _YEAR_SUMS[year], SEXES.index(sex))]
+    return pack_points(person_points(day, month, year_digit_sum(year), sex)), 0
+
+
+def lookup_row(day: int, month: int, year: int, sex: str) -> array:
+    """Значения точек для даты отдельным array('b') (копия строки таблицы)."""
+    table, offset = locate_row(day, month, year, sex)
+    return table[offset:offset + POINT_COUNT]
+
+
+def lookup_points(day: int, month: int, year: int, sex: str) -> tuple:
+    """То же, что lookup_row, в виде кортежа person_points."""
+    return unpack_points(lookup_row(day, month, year, sex))
+
+
+def verify_table(max_year: int = 9999) -> list:
+    """
+    Сверяет таблицу с живым расчётом для всех дней 1-31, месяцев 1-12,
+    сумм цифр годов 0..max_year и обоих полов, а таблицу сумм цифр - с year_digit_sum.
+    Возвращает список расхождений.
+    """
+    table = _TABLE
+    year_sums = sorted({year_digit_sum(year) for year in range(max_year + 1)})
+    mismatches = [('year', year) for year in range(len(_YEAR_SUMS))
+                  if _YEAR_SUMS[year] != year_digit_sum(year) % 22]
+    for day in range(1, 32):
+        for month in range(1, 13):
+            for sum_year in year_sums:
+                for sex_index, sex in enumerate(SEXES):
+                    expected = person_points(day, month, sum_year, sex)
+                    start = _table_key(day % 22, month, sum_year % 22, sex_index) * POINT_COUNT
+                    actual = unpack_points(table[start:start + POINT_COUNT])
+                    if actual != expected:
+                        mismatches.append((day, month, sum_year, sex))
+    return mismatches
+
+
+if __name__ == "__main__":
+    if "--verify" in sys.argv:
+        mismatches = verify_table()
+        if mismatches:
+            print(f"Расхождений с живым расчётом: {len(mismatches)}")
+            for item in mismatches[:20]:
+                print(item)
+            sys.exit(1)
+        print(f"Таблица совпадает с живым расчётом ({len(_TABLE) // POINT_COUNT} строк).")
+    else:
+        print("Использование: python pgd_points.py --verify")
@@ -0,0 +1,448 @@
+# Векторный расчёт чашек PGD_Person_Mod для массивов дат рождения (требует numpy)
+import sys
+import time
+
+import numpy as np
+
+from pgd_points import ANCESTRAL_NAMES, CROSSROAD_NAMES, PERIOD_BANDS, POINT_NAMES, SEXES, lookup_points, lookup_row
+
+# Значение для точек, которых нет у данного пола (None в скалярном расчёте)
+MISSING = -1
+
+COLUMNS = POINT_NAMES + ANCESTRAL_NAMES + CROSSROAD_NAMES
+
+
+def female_mask(sex) -> np.ndarray:
+    """Маска женщин: пол задаётся строками 'Ж'/'М' или индексами SEXES (0 - Ж, 1 - М)."""
+    sex = np.asarray(sex)
+    if sex.dtype.kind in 'UO':
+        sex = np.char.upper(sex.astype(str))
+        if not np.isin(sex, SEXES).all():
+            raise ValueError("Пол должен быть 'Ж' или 'М'")
+        return sex == 'Ж'
+    if not np.isin(sex, (0, 1)).all():
+        raise ValueError("Пол должен быть 0 (Ж) или 1 (М)")
+    return sex == 0
+
+
+def year_digit_sums(year) -> np.ndarray:
+    """Суммы цифр годов без перехода в строки."""
+    year = np.asarray(year, dtype=np.int64)
+    if (year < 0).any():
+        raise ValueError("Год не может быть отрицательным")
+    total = np.zeros_like(year)
+    rest = year.copy()
+    while rest.any():
+        total += rest % 10
+        rest //= 10
+    return total
+
+
+def calculate_points_vec(day, month, year, sex) -> dict:
+    """
+    Векторный аналог PGD_Person_Mod.calculate_points.
+
+    Принимает массивы одинаковой длины и возвращает словарь колонок int8:
+    16 точек основной чашки (POINT_NAMES), родовые данности (ANCESTRAL_NAMES)
+    и перекрёсток (CROSSROAD_NAMES). Точки М/Н у мужчин и О/П у женщин равны MISSING.
+    """
+    day = np.asarray(day, dtype=np.int64)
+    month = np.asarray(month, dtype=np.int64)
+    female = female_mask(sex)
+
+    point_A = day % 22
+    point_B = month
+    point_V = year_digit_sums(year) % 22
+    point_G = (point_A + point_B + point_V) % 22
+    point_D = (point_A + point_B) % 22
+    point_L = (22 - point_D) % 22
+    point_E = (point_B + point_V) % 22
+    point_K = (22 - point_E) % 22
+    point_J = (point_D + point_E) % 22
+    point_Z = (np.abs(point_D - point_E) + point_J) % 22
+    point_I = (point_J + point_Z) % 22
+    point_Y = (point_A + point_V + point_Z) % 22
+
+    # Ветки по полу считаются для всех и выбираются маской
+    inner_F = (point_G + point_I + point_L) % 22
+    outer_F = (inner_F + point_Y) % 22
+    inner_M = (point_G + point_I + point_K) % 22
+    outer_M = (inner_M + point_Y) % 22
+    point_M = np.where(female, inner_F, MISSING)
+    point_N = np.where(female, outer_F, MISSING)
+    point_O = np.where(female, MISSING, inner_M)
+    point_P = np.where(female, MISSING, outer_M)
+
+    # Родовые данности
+    RSD = point_J
+    ROPP = np.where(female, (point_L + point_E) % 22, (point_D + point_K) % 22)
+    RCO = (RSD + ROPP) % 22
+    RUS = point_I
+
+    # Перекрёсток: опорная точка Н у женщин и П у мужчин
+    lesson = np.where(female, outer_F, outer_M)
+    ISD = np.abs(RSD - lesson)
+    IOPP = np.abs(ROPP - lesson)
+    ICO = (ISD + IOPP) % 22
+    IUS = np.abs(RUS - lesson)
+
+    values = (point_A, point_B, point_V, point_G, point_D, point_L, point_E, point_K,
+              point_J, point_Z, point_I, point_Y, point_M, point_N, point_O, point_P,
+              RSD, ROPP, RCO, RUS, ISD, IOPP, ICO, IUS)
+    return {name: column.astype(np.int8) for name, column in zip(COLUMNS, values)}
+
+
+def to_structured(columns: dict) -> np.ndarray:
+    """Собирает словарь колонок в структурированный массив."""
+    length = len(next(iter(columns.values())))
+    result = np.empty(length, dtype=[(name, np.int8) for name in columns])
+    for name, column in columns.items():
+        result[name] = column
+    return result
+
+
+def verify_against_scalar(day, month, year, sex) -> int:
+    """Сверяет векторный расчёт с lookup_points построчно. Возвращает число расхождений."""
+    columns = calculate_points_vec(day, month, year, sex)
+    female = female_mask(sex)
+    mismatches = 0
+    for i in range(len(female)):
+        expected = lookup_points(int(day[i]), int(month[i]), int(year[i]), SEXES[0] if female[i] else SEXES[1])
+        actual = tuple(None if columns[name][i] == MISSING else int(columns[name][i]) for name in COLUMNS)
+        mismatches += actual != expected
+    return mismatches
+
+
+# --- Сверхзадачи и бизнес-периоды: то же ядро на битовых масках, что в pgd_points ---
+# Маски int32 считаются для всех строк сразу: 24 колонки дают 24 векторные операции
+# вместо гистограмм (P, 22) в памяти.
+
+TASK_NAMES = ('КР', 'ЛКО', 'БН')
+PERIOD_NAMES = ("1-й период", "2-й период", "3-й период", "4-й период")
+
+# Наибольшее значение точки: у пары точки Л и К бывают равны 22
+_MAX_VALUE = 22
+
+
+def repeat_masks_vec(columns, masks: tuple = None) -> tuple:
+    """
+    Векторный аналог repeat_masks: по последовательности колонок одинаковой длины
+    возвращает маски int32 значений, встретившихся в строке 1+, 2+ и 3+ раз.
+    MISSING пропускаются, masks досчитывает повторы по объединению колонок.
+    """
+    columns = [np.asarray(column, dtype=np.int32) for column in columns]
+    if masks is None:
+        once, twice, thrice = (np.zeros(len(columns[0]), dtype=np.int32) for _ in range(3))
+    else:
+        once, twice, thrice = (mask.copy() for mask in masks)
+    for column in columns:
+        bit = np.where(column >= 0, np.int32(1) << np.maximum(column, 0), 0)
+        thrice |= twice & bit
+        twice |= once & bit
+        once |= bit
+    return once, twice, thrice
+
+
+def mask_sums_vec(mask: np.ndarray) -> np.ndarray:
+    """Векторный аналог mask_sum: сумма значений с поднятыми битами по модулю 22, MISSING для пустой маски."""
+    total = np.zeros(len(mask), dtype=np.int32)
+    for value in range(1, _MAX_VALUE + 1):
+        total += (mask >> value & 1) * value
+    return np.where(mask != 0, total % 22, MISSING)
+
+
+def periods_from_mask_vec(repeated: np.ndarray) -> tuple:
+    """Векторный аналог periods_from_mask: четыре колонки бизнес-периодов, MISSING вместо None."""
+    periods = [mask_sums_vec(repeated & band) for band in PERIOD_BANDS]
+    present = [period != MISSING for period in periods]
+    total = sum(np.where(ok, period, 0) for ok, period in zip(present, periods)) % 22
+    periods.append(np.where(present[0] | present[1] | present[2], total, MISSING))
+    return tuple(periods)
+
+
+def person_tasks_vec(columns: dict) -> dict:
+    """
+    Векторный аналог person_tasks и person_periods для колонок calculate_points_vec.
+
+    Возвращает словарь колонок int8: КР, ЛКО, БН (TASK_NAMES) и бизнес-периоды
+    (PERIOD_NAMES); там, где скалярный расчёт даёт None, стоит MISSING.
+    """
+    cup_masks = repeat_masks_vec([columns[name] for name in POINT_NAMES])
+    # У человека ЛКО - чашка с родовыми данностями, БН - с перекрёстком
+    tasks = (mask_sums_vec(cup_masks[2]),
+             mask_sums_vec(repeat_masks_vec([columns[name] for name in ANCESTRAL_NAMES], cup_masks)[2]),
+             mask_sums_vec(repeat_masks_vec([columns[name] for name in CROSSROAD_NAMES], cup_masks)[2]))
+    values = tasks + periods_from_mask_vec(cup_masks[1])
+    return {name: column.astype(np.int8) for name, column in zip(TASK_NAMES + PERIOD_NAMES, values)}
+
+
+def verify_tasks_against_scalar(day, month, year, sex) -> int:
+    """Сверяет person_tasks_vec с person_tasks и person_periods построчно. Возвращает число расхождений."""
+    from pgd_bot import person_periods, person_tasks
+    from pgd_points import PersonChart
+
+    columns = calculate_points_vec(day, month, year, sex)
+    tasks = person_tasks_vec(columns)
+    female = female_mask(sex)
+    mismatches = 0
+    for i in range(len(female)):
+        points = lookup_row(int(day[i]), int(month[i]), int(year[i]), SEXES[0] if female[i] else SEXES[1])
+        chart = PersonChart('', '', '', points)
+        periods = person_periods(chart)
+        expected = list(person_tasks(chart).values())
+        expected += list(periods["Бизнес периоды"].values()) if periods else [None] * 4
+        actual = [None if tasks[name][i] == MISSING else int(tasks[name][i]) for name in TASK_NAMES + PERIOD_NAMES]
+        mismatches += actual != expected
+    return mismatches
+
+
+# --- Пары: те же формулы, что в PGD_Pair, для всех сочетаний людей ---
+
+PAIR_TASK_NAMES = TASK_NAMES
+PAIR_PERIOD_NAMES = PERIOD_NAMES
+PAIR_BUSINESS_NAMES = ("Задача первого", "Задача второго", "Условия сотрудничества")
+PAIR_COLUMNS = COLUMNS + PAIR_TASK_NAMES + PAIR_PERIOD_NAMES + PAIR_BUSINESS_NAMES
+
+# Оценка памяти на одну пару: индексы, промежуточные int16 и колонки результата.
+# По tracemalloc при n=5000 пик ~80 байт/пару в режиме upper и ~52 в полном,
+# 96 оставляет запас; проверяется в python pgd_vector.py --pairs
+_BYTES_PER_PAIR = 96
+
+
+def pair_points_vec(x_day, x_month, x_ysum, y_day, y_month, y_ysum) -> dict:
+    """
+    Векторный аналог PGD_Pair.main_pair, tasks, periods_pair и tasks_business.
+
+    Принимает день, месяц и сумму цифр года каждого из партнёров; массивы
+    транслируются друг на друга по правилам numpy, так что x[:, None] и y[None, :]
+    дают матрицу всех пар. Возвращает словарь колонок int8 (PAIR_COLUMNS),
+    отсутствующие значения (None в PGD_Pair) равны MISSING.
+    """
+    x_day, x_month, x_ysum = (np.asarray(a, dtype=np.int16) for a in (x_day, x_month, x_ysum))
+    y_day, y_month, y_ysum = (np.asarray(a, dtype=np.int16) for a in (y_day, y_month, y_ysum))
+
+    XY1 = (x_day + y_day) % 22
+    XY2 = (x_month + y_month) % 22
+    XY3 = x_ysum + y_ysum
+
+    point_A = XY1 % 22
+    point_B = XY2 % 22
+    point_V = XY3 % 22
+    point_G = (point_A + point_B + point_V) % 22
+    point_D = (point_A + point_B) % 22
+    point_L = 22 - point_D
+    point_E = (point_B + point_V) % 22
+    point_K = 22 - point_E
+    point_J = (point_D + point_E) % 22
+    point_Z = (np.abs(point_D - point_E) + point_J) % 22
+    point_I = (point_J + point_Z) % 22
+    point_Y = (point_A + point_V + point_Z) % 22
+
+    point_M = (point_G + point_I + point_L) % 22
+    point_N = (point_M + point_Y) % 22
+    point_O = (point_G + point_I + point_K) % 22
+    point_P = (point_O + point_Y) % 22
+
+    RSD = point_J
+    ROPP = np.abs((point_L + point_E) % 22 - (point_D + point_K) % 22)
+    RCO = (RSD + ROPP) % 22
+    RUS = point_I
+
+    ISD = (np.abs(point_J - point_N) + np.abs(point_J - point_P)) % 22
+    IOPP = (np.abs(ROPP - point_N) + np.abs(ROPP - point_P)) % 22
+    ICO = (ISD + IOPP) % 22
+    IUS = (np.abs(RUS - point_N) + np.abs(RUS - point_P)) % 22
+
+    cup = (point_A, point_B, point_V, point_G, point_D, point_L, point_E, point_K,
+           point_J, point_Z, point_I, point_Y, point_M, point_N, point_O, point_P)
+    ancestral = (RSD, ROPP, RCO, RUS)
+    crossroad = (ISD, IOPP, ICO, IUS)
+
+    # Повторы считаются по плоскому списку пар, затем результат возвращается к исходной форме
+    shape = np.broadcast(*cup).shape
+    cup_flat = [np.broadcast_to(v, shape).ravel() for v in cup]
+    ancestral_flat = [np.broadcast_to(v, shape).ravel() for v in ancestral]
+    crossroad_flat = [np.broadcast_to(v, shape).ravel() for v in crossroad]
+    cup_masks = repeat_masks_vec(cup_flat)
+
+    # В паре, в отличие от человека, ЛКО берёт перекрёсток, а БН - родовые данности
+    KR = mask_sums_vec(cup_masks[2])
+    LKO = mask_sums_vec(repeat_masks_vec(crossroad_flat, cup_masks)[2])
+    BN = mask_sums_vec(repeat_masks_vec(ancestral_flat, cup_masks)[2])
+    periods = periods_from_mask_vec(cup_masks[1])
+
+    # Задачи партнёров
+    Z1 = (XY1 + XY2) + (XY2 + XY3)
+    Z2 = np.abs((XY1 + XY2) - (XY2 + XY3))
+    Z3 = Z1 + Z2
+    task_1 = np.broadcast_to((x_day + x_ysum + Z3) % 22, shape).ravel()
+    task_2 = np.broadcast_to((y_day + y_ysum + Z3) % 22, shape).ravel()
+    period_4 = periods[3]
+    conditions = np.where(period_4 == MISSING, MISSING, (task_1 + task_2 + period_4) % 22)
+
+    result = {name: np.broadcast_to(column, shape).astype(np.int8)
+              for name, column in zip(COLUMNS, cup + ancestral + crossroad)}
+    flat = (KR, LKO, BN) + periods + (task_1, task_2, conditions)
+    for name, column in zip(PAIR_TASK_NAMES + PAIR_PERIOD_NAMES + PAIR_BUSINESS_NAMES, flat):
+        result[name] = column.astype(np.int8).reshape(shape)
+    return result
+
+
+# Чашка, задачи и периоды пары зависят только от (XY1, XY2, XY3 % 22) - это 22 ** 3
+# сочетаний. Формулы один раз считаются по всем сочетаниям, а для пар популяции
+# остаётся вычислить номер сочетания и взять готовые значения из таблицы.
+_TABLE_COLUMNS = COLUMNS + PAIR_TASK_NAMES + PAIR_PERIOD_NAMES
+_pair_table = None
+
+
+def pair_table() -> dict:
+    """{колонка: массив int8 длины 22 ** 3} по номеру сочетания (XY1 * 22 + XY2) * 22 + XY3 % 22."""
+    global _pair_table
+    if _pair_table is None:
+        xy1, xy2, xy3 = (a.ravel() for a in np.meshgrid(np.arange(22), np.arange(22), np.arange(22), indexing='ij'))
+        zeros = np.zeros_like(xy1)
+        columns = pair_points_vec(xy1, xy2, xy3, zeros, zeros, zeros)
+        _pair_table = {name: np.ascontiguousarray(columns[name]) for name in _TABLE_COLUMNS}
+    return _pair_table
+
+
+def pair_block(x_day, x_month, x_ysum, y_day, y_month, y_ysum) -> dict:
+    """Значения PAIR_COLUMNS для пар из транслируемых массивов через таблицу сочетаний."""
+    XY1 = (x_day + y_day) % 22
+    XY2 = (x_month + y_month) % 22
+    XY3 = x_ysum + y_ysum
+    key = (XY1 * 22 + XY2) * 22 + XY3 % 22
+
+    table = pair_table()
+    block = {name: column[key] for name, column in table.items()}
+
+    # Задачи партнёров зависят от XY3 без % 22 и дня каждого партнёра, их считаем формулой
+    Z3 = ((XY1 + XY2) + (XY2 + XY3)) + np.abs(XY1 - XY3)
+    task_1 = (x_day + x_ysum + Z3) % 22
+    task_2 = (y_day + y_ysum + Z3) % 22
+    period_4 = block["4-й период"]
+    block["Задача первого"] = task_1.astype(np.int8)
+    block["Задача второго"] = task_2.astype(np.int8)
+    block["Условия сотрудничества"] = np.where(period_4 == MISSING, MISSING,
+                                               (task_1 + task_2 + period_4) % 22).astype(np.int8)
+    return block
+
+
+def iter_pair_blocks(day, month, year, upper: bool = True, memory_budget: int = 256 * 1024 ** 2):
+    """
+    Считает все пары популяции блоками строк, укладываясь в memory_budget байт.
+
+    upper=True: только пары i < j; блок - словарь одномерных колонок
+    плюс индексы 'i' и 'j'. upper=False: полная матрица; блок - словарь
+    двумерных колонок для строк block['rows'] против всех людей.
+    """
+    day = np.asarray(day, dtype=np.int16)
+    month = np.asarray(month, dtype=np.int16)
+    ysum = year_digit_sums(year).astype(np.int16)
+    count = len(day)
+    rows_per_block = max(1, memory_budget // (_BYTES_PER_PAIR * max(count, 1)))
+
+    for start in range(0, count, rows_per_block):
+        stop = min(count, start + rows_per_block)
+        if not upper:
+            rows = slice(start, stop)
+            block = pair_block(day[rows, None], month[rows, None], ysum[rows, None],
+                               day[None, :], month[None, :], ysum[None, :])
+            block['rows'] = rows
+            yield block
+            # Прежний блок отпускается до расчёта следующего, иначе в пике их два
+            del block
+            continue
+
+        # Пары i < j для строк блока: сначала индексы, затем значения только для них
+        i_idx, j_idx = np.nonzero(np.arange(count)[None, :] > np.arange(start, stop)[:, None])
+        if not len(i_idx):
+            break
+        i_idx += start
+        block = pair_block(day[i_idx], month[i_idx], ysum[i_idx], day[j_idx], month[j_idx], ysum[j_idx])
+        block['i'] = i_idx
+        block['j'] = j_idx
+        yield block
+        del block, i_idx, j_idx
+
+
+def _pair_peak_over_budget(day, month, year, memory_budget: int = 64 * 1024 ** 2) -> int:
+    """Пик памяти iter_pair_blocks в обоих режимах по tracemalloc. Возвращает число режимов сверх бюджета."""
+    import tracemalloc
+
+    over = 0
+    for upper in (True, False):
+        tracemalloc.start()
+        for block in iter_pair_blocks(day, month, year, upper=upper, memory_budget=memory_budget):
+            del block
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"upper={upper}: пик {peak / 1024 ** 2:.1f} МиБ при бюджете {memory_budget / 1024 ** 2:.0f} МиБ")
+        over += peak > memory_budget
+    return over
+
+
+def _verify_pairs_against_scalar(day, month, year) -> int:
+    """Сверяет iter_pair_blocks с PGD_Pair на всех парах популяции. Возвращает число расхождений."""
+    from pgd_bot import PGD_Pair
+
+    dates = [f"{d:02d}.{m:02d}.{y}" for d, m, y in zip(day, month, year)]
+    mismatches = 0
+    for block in iter_pair_blocks(day, month, year, memory_budget=1024 ** 2):
+        for n, (a, b) in enumerate(zip(block['i'], block['j'])):
+            pair = PGD_Pair('a', dates[a], 'b', dates[b])
+            expected = [v for section in pair.main_pair().values() for v in section.values()]
+            expected += list(pair.tasks()["Сверхзадачи"].values())
+            periods = pair.periods_pair()
+            expected += list(periods["Бизнес периоды"].values()) if periods else [None] * 4
+
+            actual = [None if block[name][n] == MISSING else int(block[name][n]) for name in PAIR_COLUMNS]
+            if expected[-1] is None:
+                # Без 4-го периода tasks_business падает, а векторный расчёт даёт условия MISSING
+                mismatches += actual[:-3] != expected or actual[-1] is not None
+            else:
+                mismatches += actual != expected + list(pair.tasks_business().values())
+    return mismatches
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    if sys.argv[1:2] == ['--pairs']:
+        # python pgd_vector.py --pairs N: все N * (N - 1) / 2 пар популяции из N человек
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+        day = rng.integers(1, 29, size)
+        month = rng.integers(1, 13, size)
+        year = rng.integers(1940, 2010, size)
+
+        started = time.perf_counter()
+        pairs = sum(len(block['i']) for block in iter_pair_blocks(day, month, year))
+        seconds = time.perf_counter() - started
+        print(f"{pairs} пар за {seconds:.2f} с ({pairs / seconds:,.0f} пар/с)")
+
+        sample = slice(0, min(size, 100))
+        mismatches = _verify_pairs_against_scalar(day[sample], month[sample], year[sample])
+        print(f"Расхождений с PGD_Pair на выборке: {mismatches}")
+        over_budget = _pair_peak_over_budget(day, month, year)
+        sys.exit(1 if mismatches or over_budget else 0)
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    day = rng.integers(1, 32, size)
+    month = rng.integers(1, 13, size)
+    year = rng.integers(1900, 2030, size)
+    sex = rng.integers(0, 2, size)
+
+    started = time.perf_counter()
+    columns = calculate_points_vec(day, month, year, sex)
+    seconds = time.perf_counter() - started
+    print(f"{size} строк за {seconds:.3f} с ({size / seconds:,.0f} строк/с)")
+
+    started = time.perf_counter()
+    person_tasks_vec(columns)
+    seconds = time.perf_counter() - started
+    print(f"Сверхзадачи и периоды: {seconds:.3f} с ({size / seconds:,.0f} строк/с)")
+
+    sample = slice(0, min(size, 20000))
+    mismatches = verify_against_scalar(day[sample], month[sample], year[sample], sex[sample])
+    mismatches += verify_tasks_against_scalar(day[sample], month[sample], year[sample], sex[sample])
+    print(f"Расхождений со скалярным расчётом на выборке: {mismatches}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,161 @@
+# Вынос тяжёлых расчётов из цикла событий бота в пул потоков или процессов
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from markdown_escape import escape_markdown
+from pgd_bot import person_periods, person_tasks
+from message_render import description_key, description_slot
+from pgd_points import PersonChart, locate_row, parse_date
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ('thread', 'process', 'inline')
+
+
+def build_summary_text(name: str, date_str: str, tasks_data: dict, periods_data: dict) -> str:
+    """Сводка задач и периодов в MarkdownV2. Пустая строка, если показывать нечего."""
+    header = f"*Результаты анализа для {escape_markdown(name)} \\({escape_markdown(date_str)}\\)*\n\n"
+
+    summary_text = ""
+    if tasks_data:
+        summary_text += "*Задачи по Матрице:*\n"
+        for key, val in tasks_data.items():
+            summary_text += f"_{escape_markdown(key)}_ `{escape_markdown(val) if val is not None else '-'}`\n"
+    if periods_data and "Бизнес периоды" in periods_data:
+        summary_text += "\n*Бизнес Периоды:*\n"
+        for key, val in periods_data["Бизнес периоды"].items():
+            summary_text += f"_{escape_markdown(key)}_: `{escape_markdown(val) if val is not None else '-'}`\n"
+
+    return header + summary_text if summary_text else ""
+
+
+def chart_description_slots(chart: PersonChart) -> list:
+    """
+    Слоты описаний (см. message_render) для точек чашки в том же порядке,
+    что и в get_full_description: только номера, без строк и словарей.
+    """
+    return [description_slot(point_index, value) for point_index, value in enumerate(chart.cup) if value >= 0]
+
+
+def chart_description_keys(chart: PersonChart) -> list:
+    """Ключи описаний "Точка X = N" для чашки, из общей таблицы ключей."""
+    return [description_key(slot) for slot in chart_description_slots(chart)]
+
+
+def chart_from_state(state: dict) -> PersonChart:
+    """Восстанавливает чашку по сохранённому в хранилище ключу."""
+    return PersonChart.from_date(state['name'], state['date'], state['sex'])
+
+
+def build_person_result(name: str, date_str: str, sex: str) -> dict:
+    """
+    Синхронная часть get_gender: чашка, задачи, периоды, слоты описаний и текст сводки.
+
+    Функция модульного уровня и возвращает только простые типы,
+    поэтому годится и для пула процессов. Сами тексты описаний не возвращаются:
+    сообщения с ними отрендерены заранее (см. message_render).
+    В 'timings' - секунды по этапам для метрик.
+    """
+    # Время этапов возвращается вместе с результатом: в пуле процессов метрики
+    # дочернего процесса иначе потерялись бы, записывает их обработчик
+    timings = {}
+    started = time.perf_counter()
+    day, month, year = parse_date(date_str)
+    timings['date_parse'], started = _elapsed(started)
+
+    # Считаем чашку один раз, задачи и периоды берём из неё
+    chart = PersonChart(name, date_str, sex, *locate_row(day, month, year, sex))
+    timings['chart'], started = _elapsed(started)
+    tasks_data = person_tasks(chart)
+    periods_data = person_periods(chart)
+    timings['tasks_periods'], started = _elapsed(started)
+    description_slots = chart_description_slots(chart)
+    timings['description_keys'], started = _elapsed(started)
+    summary_text = build_summary_text(name, date_str, tasks_data, periods_data)
+    timings['escape'], started = _elapsed(started)
+
+    return {
+        'tasks_data': tasks_data,
+        'periods_data': periods_data,
+        'description_slots': description_slots,
+        'summary_text': summary_text,
+        'timings': timings,
+    }
+
+
+def _elapsed(started: float) -> tuple:
+    now = time.perf_counter()
+    return now - started, now
+
+
+class PipelineBusy(Exception):
+    """Очередь на расчёт переполнена, запрос нужно отклонить."""
+
+
+class PipelineExecutor:
+    """
+    Запускает синхронные функции вне цикла событий.
+
+    Одновременно выполняется не больше workers задач, ещё max_pending ждут
+    своей очереди. Всё сверх этого сразу отклоняется исключением PipelineBusy,
+    чтобы при всплеске нагрузки очередь не росла без ограничений.
+
+    Расчёт /start занимает доли миллисекунды, и на нагрузочном тесте
+    (benchmarks.load_start_flow) thread, process и inline дают одинаковую
+    пропускную способность и p99: узкое место - разбор обновлений и отправка
+    в python-telegram-bot, а не расчёт. Пул нужен как ограничитель очереди
+    и запас на тяжёлые расчёты; процессам корпус описаний не нужен, поэтому
+    они его не загружают.
+    """
+
+    def __init__(self, kind: str = 'thread', workers: int = 4, max_pending: int = 64):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Неизвестный тип исполнителя: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._in_flight = 0
+        self._semaphore = None
+        if kind == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pgd-pipeline')
+        elif kind == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._pool = None
+
+    @classmethod
+    def from_env(cls) -> "PipelineExecutor":
+        """Настройки из переменных окружения PGD_EXECUTOR, PGD_EXECUTOR_WORKERS, PGD_EXECUTOR_MAX_PENDING."""
+        return cls(
+            kind=os.getenv('PGD_EXECUTOR', 'thread'),
+            workers=int(os.getenv('PGD_EXECUTOR_WORKERS', '4')),
+            max_pending=int(os.getenv('PGD_EXECUTOR_MAX_PENDING', '64')),
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Сколько задач сейчас выполняется или ждёт исполнителя."""
+        return self._in_flight
+
+    async def run(self, func, *args):
+        if self._in_flight >= self.workers + self.max_pending:
+            raise PipelineBusy(f"В очереди уже {self._in_flight} задач")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        self._in_flight += 1
+        try:
+            async with self._semaphore:
+                if self._pool is None:
+                    return func(*args)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool, func, *args)
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
@@ -0,0 +1,203 @@
+# Текстовый отчёт для кнопки "Скачать результат в .txt"
+#
+# Отчёт собирается по частям в байтах: до REPORT_SPOOL_MAX_SIZE он отдаётся из
+# памяти (BytesIO), а больший дописывается во временный файл на диске. Целая строка
+# отчёта при этом не собирается. SpooledTemporaryFile здесь не годится: httpx при
+# загрузке вызывает fileno(), и это переносит на диск даже маленький отчёт.
+#
+# Тело отчёта (всё, кроме шапки с именем) зависит только от значений чашки,
+# поэтому кешируется по подписи чашки. Для уже загруженных в Telegram файлов
+# запоминается file_id: повторная отправка идёт по нему, без генерации и загрузки.
+import io
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from tempfile import TemporaryFile
+
+from cache_info import CacheInfo
+from cashka_preprocessor import full_point_description
+from pgd_bot import person_periods, person_tasks
+from pgd_points import PersonChart
+from pipeline import chart_description_keys
+
+REPORT_SPOOL_MAX_SIZE = 256 * 1024
+REPORT_ENCODING = 'utf-8'
+
+
+def report_header(name: str, dob_str: str) -> str:
+    return f"Анализ личности\n{'='*20}\nИмя: {name}\nДата рождения: {dob_str}\n{'='*20}\n"
+
+
+def iter_report_parts(name: str, dob_str: str, descriptions, tasks: dict, periods: dict):
+    """
+    Части отчёта по порядку. descriptions - пары (ключ, описание), можно генератор.
+    Склеенные части совпадают с format_results_for_download.
+    """
+    yield report_header(name, dob_str)
+    yield from iter_report_body(descriptions, tasks, periods)
+
+
+def format_results_for_download(name: str, dob: datetime, results: dict, tasks: dict, periods: dict) -> str:
+    """Отчёт одной строкой. Бот отправляет файл потоково, см. chart_report_file."""
+    return "".join(iter_report_parts(name, dob.strftime('%d.%m.%Y'), results.items(), tasks, periods))
+
+
+def iter_report_body(descriptions, tasks: dict, periods: dict):
+    """Части отчёта после шапки: задачи, периоды и описания."""
+    yield "\n--- Задачи по Матрице ---\n"
+    if tasks:
+        for key, value in tasks.items():
+            yield f"{key}: {value if value is not None else '-'}\n"
+
+    yield "\n--- Бизнес Периоды ---\n"
+    if periods and "Бизнес периоды" in periods:
+        for key, value in periods["Бизнес периоды"].items():
+            yield f"{key}: {value if value is not None else '-'}\n"
+
+    yield "\n--- Подробное описание ---\n"
+    for key, value in descriptions:
+        clean_value = value.replace('**', '').replace('*', '').replace('\n\n', '\n')
+        yield f"\n--- {key} ---\n{clean_value}\n"
+
+
+def write_report(out, name: str, dob_str: str, descriptions, tasks: dict, periods: dict) -> int:
+    """Пишет отчёт в бинарный поток out, возвращает число байт."""
+    written = 0
+    for part in iter_report_parts(name, dob_str, descriptions, tasks, periods):
+        written += out.write(part.encode(REPORT_ENCODING))
+    return written
+
+
+def chart_descriptions(chart: PersonChart):
+    """Пары (ключ, описание) для чашки, описания берутся из кеша по одному."""
+    for key in chart_description_keys(chart):
+        yield key, full_point_description(key)
+
+
+def chart_signature(chart: PersonChart) -> str:
+    """Подпись чашки: одинаковые значения точек дают одинаковое тело отчёта."""
+    return ','.join('-' if value < 0 else str(value) for value in chart.points)
+
+
+class ReportBodyCache:
+    """LRU тел отчётов (bytes) по подписи чашки с ограничением на суммарный размер."""
+
+    def __init__(self, max_bytes: int = 32 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self._bodies = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, signature: str):
+        with self._lock:
+            body = self._bodies.get(signature)
+            if body is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._bodies.move_to_end(signature)
+            return body
+
+    def put(self, signature: str, body: bytes) -> None:
+        with self._lock:
+            old = self._bodies.pop(signature, None)
+            if old is not None:
+                self._size -= len(old)
+            self._bodies[signature] = body
+            self._size += len(body)
+            while self._size > self.max_bytes and self._bodies:
+                self._size -= len(self._bodies.popitem(last=False)[1])
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.max_bytes, self._size)
+
+
+class FileIdCache:
+    """LRU file_id уже отправленных в Telegram отчётов."""
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._file_ids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            file_id = self._file_ids.get(key)
+            if file_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._file_ids.move_to_end(key)
+            return file_id
+
+    def set(self, key: tuple, file_id: str) -> None:
+        with self._lock:
+            self._file_ids[key] = file_id
+            self._file_ids.move_to_end(key)
+            while len(self._file_ids) > self.max_entries:
+                self._file_ids.popitem(last=False)
+
+    def discard(self, key: tuple) -> None:
+        with self._lock:
+            self._file_ids.pop(key, None)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.max_entries, len(self._file_ids))
+
+
+report_bodies = ReportBodyCache(int(os.getenv('PGD_REPORT_CACHE_BYTES', str(32 * 2 ** 20))))
+report_file_ids = FileIdCache(int(os.getenv('PGD_REPORT_FILE_IDS', '50000')))
+
+
+def report_file_key(name: str, date_str: str, chart: PersonChart) -> tuple:
+    """Ключ готового документа: имя и дата в шапке и имени файла плюс подпись чашки."""
+    return name, date_str, chart_signature(chart)
+
+
+def chart_report_file(name: str, date_str: str, chart: PersonChart, bodies: ReportBodyCache = report_bodies):
+    """
+    Отчёт по чашке как бинарный файл, позиция - в начале. Закрыть должен вызывающий.
+    Отчёт до REPORT_SPOOL_MAX_SIZE (в том числе из кеша тел) - BytesIO, больший - временный файл.
+    """
+    header = report_header(name, date_str).encode(REPORT_ENCODING)
+    signature = chart_signature(chart)
+    body = bodies.get(signature)
+    if body is not None:
+        return io.BytesIO(header + body)
+
+    parts = iter_report_body(chart_descriptions(chart), person_tasks(chart), person_periods(chart))
+    collected, size = [], len(header)
+    for part in parts:
+        data = part.encode(REPORT_ENCODING)
+        collected.append(data)
+        size += len(data)
+        if size > REPORT_SPOOL_MAX_SIZE:
+            # Большие тела не кешируются: накопленное и остаток уходят в файл
+            return _spill_report(header, collected, parts)
+    body = b''.join(collected)
+    bodies.put(signature, body)
+    return io.BytesIO(header + body)
+
+
+def _spill_report(header: bytes, collected: list, parts):
+    report = TemporaryFile(mode='w+b')
+    try:
+        report.write(header)
+        report.writelines(collected)
+        collected.clear()
+        for part in parts:
+            report.write(part.encode(REPORT_ENCODING))
+        report.seek(0)
+    except BaseException:
+        report.close()
+        raise
+    return report
+
+
+def report_filename(name: str, date_str: str) -> str:
+    """Имя файла отчёта без символов, недопустимых в именах файлов."""
+    safe_name = ''.join(ch for ch in name if ch.isalnum() or ch in ' -_').strip().replace(' ', '_') or 'report'
+    return f"{safe_name}_{date_str.replace('.', '-')}.txt"
@@ -0,0 +1,189 @@
+# Хранилище состояния диалога с ограниченным размером и временем жизни записей
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore(ABC):
+    """
+    Базовый интерфейс хранилища состояния пользователя.
+
+    Состояние - небольшой словарь с ключом чашки (имя, дата, пол); описания
+    по нему собираются заново при необходимости, поэтому тексты здесь не хранятся.
+    """
+
+    @abstractmethod
+    def get(self, user_id: int):
+        ...
+
+    @abstractmethod
+    def set(self, user_id: int, state: dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, user_id: int) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """LRU в памяти: не больше max_entries записей, каждая живёт ttl секунд."""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is None:
+                return None
+            expires_at, state = item
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(state)
+
+    def set(self, user_id: int, state: dict) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(state))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Состояние в локальном файле SQLite, переживает перезапуск бота.
+
+    Методы вызываются из обработчиков в цикле событий, поэтому запись не ждёт диска:
+    set и delete кладут изменение в очередь, а фоновый поток пишет накопившееся
+    одной транзакцией не реже, чем раз в FLUSH_INTERVAL секунд. Пока изменение
+    не записано, get берёт его из очереди. При аварийном завершении теряется
+    не больше последних FLUSH_INTERVAL секунд изменений.
+    """
+
+    # Просроченные записи вычищаются не чаще, чем раз в столько записей
+    PURGE_EVERY = 500
+    FLUSH_INTERVAL = 0.05
+
+    def __init__(self, path: str, ttl: float = 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        # user_id -> (JSON состояния или None для удаления, срок жизни)
+        self._pending = {}
+        self._flushing = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_state ("
+            "user_id INTEGER PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        # Отдельное соединение для записи: чтение в WAL не ждёт чужой транзакции
+        self._writer_conn = sqlite3.connect(path, check_same_thread=False)
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name='sqlite-state-writer', daemon=True)
+        self._writer.start()
+
+    def get(self, user_id: int):
+        with self._lock:
+            item = self._pending.get(user_id) or self._flushing.get(user_id)
+            if item is None:
+                row = self._conn.execute(
+                    "SELECT state FROM user_state WHERE user_id = ? AND expires_at >= ?",
+                    (user_id, time.time()),
+                ).fetchone()
+                return json.loads(row[0]) if row else None
+        state, expires_at = item
+        return json.loads(state) if state is not None and expires_at >= time.time() else None
+
+    def set(self, user_id: int, state: dict) -> None:
+        item = (json.dumps(state, ensure_ascii=False), time.time() + self.ttl)
+        with self._lock:
+            self._pending[user_id] = item
+        self._wakeup.set()
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._pending[user_id] = (None, 0.0)
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        """Записывает накопившиеся изменения одной транзакцией (в фоновом потоке или при закрытии)."""
+        with self._lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            batch = self._flushing
+        upserts = [(user_id, state, expires_at) for user_id, (state, expires_at) in batch.items() if state is not None]
+        deletes = [(user_id,) for user_id, (state, _) in batch.items() if state is None]
+        try:
+            with self._writer_conn:
+                self._writer_conn.executemany(
+                    "INSERT OR REPLACE INTO user_state (user_id, state, expires_at) VALUES (?, ?, ?)", upserts)
+                self._writer_conn.executemany("DELETE FROM user_state WHERE user_id = ?", deletes)
+                if (self._writes + len(upserts)) // self.PURGE_EVERY != self._writes // self.PURGE_EVERY:
+                    self._writer_conn.execute("DELETE FROM user_state WHERE expires_at < ?", (time.time(),))
+            self._writes += len(upserts)
+        except sqlite3.Error:
+            # Не записанное вернётся в очередь; более свежие изменения важнее
+            with self._lock:
+                self._pending = {**batch, **self._pending}
+                self._flushing = {}
+            raise
+        with self._lock:
+            self._flushing = {}
+
+    def _write_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception(f"Не удалось записать состояние в {self.path}")
+            # Изменения, пришедшие за паузу, уйдут следующей транзакцией
+            time.sleep(self.FLUSH_INTERVAL)
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+        self._writer_conn.close()
+
+
+def state_store_from_env() -> StateStore:
+    """Хранилище по переменным окружения PGD_STATE_BACKEND, PGD_STATE_PATH, PGD_STATE_TTL, PGD_STATE_MAX_ENTRIES."""
+    backend = os.getenv('PGD_STATE_BACKEND', 'memory')
+    ttl = float(os.getenv('PGD_STATE_TTL', str(24 * 3600)))
+    if backend == 'memory':
+        return MemoryStateStore(max_entries=int(os.getenv('PGD_STATE_MAX_ENTRIES', '10000')), ttl=ttl)
+    if backend == 'sqlite':
+        return SQLiteStateStore(os.getenv('PGD_STATE_PATH', 'pgd_state.sqlite3'), ttl=ttl)
+    raise ValueError(f"Неизвестное хранилище состояния: {backend}")
@@ -0,0 +1,231 @@
+# Режим webhook: небольшой HTTP/1.1-сервер на asyncio вместо run_polling
+#
+# Telegram присылает обновления POST-запросами на PGD_WEBHOOK_URL, сервер кладёт
+# их в очередь приложения и сразу отвечает 200. GET /healthz отдаёт состояние
+# бота для балансировщика или мониторинга. Сторонних веб-фреймворков не нужно:
+# встроенный run_webhook из python-telegram-bot требует tornado и не умеет /healthz.
+import asyncio
+import json
+import logging
+import os
+import secrets
+import signal
+import ssl
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+HEALTH_PATH = '/healthz'
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HttpRequest(NamedTuple):
+    method: str
+    path: str
+    headers: dict
+    body: bytes
+
+
+class HttpError(Exception):
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """Один запрос из соединения; None, если клиент закрыл соединение."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(400)
+
+    request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = request_line.split(' ', 2)
+    except ValueError:
+        raise HttpError(400)
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HttpError(400)
+    if length < 0:
+        raise HttpError(400)
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413)
+    body = await reader.readexactly(length) if length else b''
+    return HttpRequest(method, target.split('?', 1)[0], headers, body)
+
+
+def write_response(writer: asyncio.StreamWriter, status: int, body: bytes = b'',
+                   content_type: str = 'application/json', keep_alive: bool = True) -> None:
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+
+
+async def serve_http(handle, host: str, port: int, ssl_context: ssl.SSLContext = None) -> asyncio.Server:
+    """
+    Сервер с keep-alive. handle(request) -> (статус, тело, content-type),
+    корутина; исключение HttpError превращается в ответ с его статусом.
+    """
+    async def on_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    status, body, content_type = await handle(request)
+                except HttpError as e:
+                    write_response(writer, e.status, keep_alive=False)
+                    break
+                except Exception:
+                    logger.exception("Ошибка при обработке HTTP-запроса")
+                    write_response(writer, 500, keep_alive=False)
+                    break
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                write_response(writer, status, body, content_type, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(on_connection, host, port, ssl=ssl_context)
+
+
+class WebhookConfig(NamedTuple):
+    url: str
+    listen: str = '0.0.0.0'
+    port: int = 8443
+    path: str = '/'
+    secret_token: str = ''
+    cert: str = ''
+    key: str = ''
+    max_connections: int = 40
+
+    @classmethod
+    def from_env(cls) -> "WebhookConfig":
+        """PGD_WEBHOOK_URL (обязателен), PGD_WEBHOOK_LISTEN, PGD_WEBHOOK_PORT, PGD_WEBHOOK_PATH,
+        PGD_WEBHOOK_SECRET, PGD_WEBHOOK_CERT, PGD_WEBHOOK_KEY, PGD_WEBHOOK_MAX_CONNECTIONS."""
+        url = os.getenv('PGD_WEBHOOK_URL')
+        if not url:
+            raise ValueError("Для режима webhook нужен PGD_WEBHOOK_URL")
+        return cls(
+            url=url,
+            listen=os.getenv('PGD_WEBHOOK_LISTEN', '0.0.0.0'),
+            port=int(os.getenv('PGD_WEBHOOK_PORT', '8443')),
+            path=os.getenv('PGD_WEBHOOK_PATH') or urlsplit(url).path or '/',
+            # Без заданного секрета генерируется случайный: чужие POST на адрес будут отклонены
+            secret_token=os.getenv('PGD_WEBHOOK_SECRET') or secrets.token_urlsafe(32),
+            cert=os.getenv('PGD_WEBHOOK_CERT', ''),
+            key=os.getenv('PGD_WEBHOOK_KEY', ''),
+            max_connections=int(os.getenv('PGD_WEBHOOK_MAX_CONNECTIONS', '40')),
+        )
+
+    def ssl_context(self):
+        if not self.cert:
+            return None
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(self.cert, self.key or None)
+        return context
+
+
+class WebhookServer:
+    """Принимает обновления Telegram и отвечает на /healthz."""
+
+    def __init__(self, application: Application, config: WebhookConfig, health=None):
+        self.application = application
+        self.config = config
+        self.health = health
+        self.updates_received = 0
+
+    async def handle(self, request: HttpRequest) -> tuple:
+        if request.path == HEALTH_PATH:
+            if request.method != 'GET':
+                raise HttpError(405)
+            return self._health()
+        if request.path != self.config.path:
+            raise HttpError(404)
+        if request.method != 'POST':
+            raise HttpError(405)
+        if not secrets.compare_digest(request.headers.get(SECRET_HEADER, ''), self.config.secret_token):
+            raise HttpError(403)
+
+        try:
+            update = Update.de_json(json.loads(request.body), self.application.bot)
+        except (ValueError, TypeError, KeyError):
+            raise HttpError(400)
+        self.updates_received += 1
+        # Обработка идёт в самом приложении, Telegram получает ответ сразу
+        await self.application.update_queue.put(update)
+        return 200, b'', 'application/json'
+
+    def _health(self) -> tuple:
+        running = self.application.running
+        data = {
+            'status': 'ok' if running else 'stopping',
+            'updates_received': self.updates_received,
+            'update_queue': self.application.update_queue.qsize(),
+        }
+        if self.health is not None:
+            data.update(self.health())
+        body = json.dumps(data).encode('utf-8')
+        return (200 if running else 503), body, 'application/json'
+
+
+async def run_webhook(application: Application, config: WebhookConfig, health=None,
+                      stop_event: asyncio.Event = None) -> None:
+    """
+    Запускает приложение, регистрирует webhook и обслуживает его до SIGINT/SIGTERM
+    (или до stop_event). post_init и post_shutdown приложения вызываются, как в run_polling.
+    """
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+    server = WebhookServer(application, config, health)
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.bot.set_webhook(url=config.url, secret_token=config.secret_token,
+                                          allowed_updates=Update.ALL_TYPES, max_connections=config.max_connections)
+        await application.start()
+        http_server = await serve_http(server.handle, config.listen, config.port, config.ssl_context())
+        logger.info(f"Webhook слушает {config.listen}:{http_server.sockets[0].getsockname()[1]}{config.path}")
+        try:
+            await stop_event.wait()
+        finally:
+            http_server.close()
+            # Соединения keep-alive от Telegram могут висеть долго, ждём их ограниченно
+            try:
+                await asyncio.wait_for(http_server.wait_closed(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            await application.stop()
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)